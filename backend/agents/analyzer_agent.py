@@ -1,13 +1,60 @@
 """
 Analyzer Agent - Validates results and generates comprehensive reports
 """
-import json
+import os
+import tempfile
+from collections import Counter
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Iterator, Sequence
 from datetime import datetime
+from dataclasses import dataclass, field
 
 from .base_agent import BaseAgent
 from ..config import settings
+from ..utils import jsonlib
+
+
+# Shared read-only default for missing nested dicts; never mutate
+_EMPTY_DICT: Dict[str, Any] = {}
+
+# Verdicts that count as conclusive in the summary
+_CONCLUSIVE_VERDICTS = ("PASS", "FAIL", "FLAKY")
+
+# Summary for a session with no results; copied before being returned
+_EMPTY_SUMMARY: Dict[str, Any] = {
+    "total_tests": 0,
+    "passed": 0,
+    "failed": 0,
+    "flaky": 0,
+    "inconclusive": 0,
+    "pass_rate": 0,
+    "overall_status": "NO_TESTS"
+}
+
+
+@dataclass
+class _ResultScan:
+    """Aggregates collected in a single pass over execution results."""
+    
+    counts: Counter = field(default_factory=Counter)
+    repro_min: Optional[float] = None
+    repro_max: Optional[float] = None
+    repro_sum: float = 0
+    highly_reproducible: int = 0
+    flaky_tests: int = 0
+    formatted: List[Dict] = field(default_factory=list)
+    triage_high: List[Dict] = field(default_factory=list)
+    triage_medium: List[Dict] = field(default_factory=list)
+
+
+def _iter_file_names(path: str) -> Iterator[str]:
+    """Recursively yield file names under path using os.scandir."""
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from _iter_file_names(entry.path)
+            elif entry.is_file():
+                yield entry.name
 
 
 class AnalyzerAgent(BaseAgent):
@@ -25,6 +72,8 @@ class AnalyzerAgent(BaseAgent):
             name="Analyzer",
             description="Analyzes results and generates reports"
         )
+        # Running verdict counts and rows per session for progressive reports
+        self._progress: Dict[str, Dict[str, Any]] = {}
         
     async def execute(self, context: Dict[str, Any]) -> Dict[str, Any]:
         """Execute analysis and report generation."""
@@ -56,30 +105,98 @@ class AnalyzerAgent(BaseAgent):
         """
         self.log_info(f"Generating report for session {session_id}")
         
+        # Collect every per-result aggregate in one traversal
+        scan = self._scan_results(execution_results)
+        total = len(execution_results)
+        
+        summary = self._generate_summary(scan.counts, total)
+        repro_stats = self._calculate_reproducibility_stats(scan, total)
+        
         report = {
             "report_id": f"report_{session_id}",
             "session_id": session_id,
             "generated_at": datetime.now().isoformat(),
             "game_info": self._extract_game_info(game_analysis),
-            "summary": self._generate_summary(execution_results),
-            "test_results": self._format_test_results(execution_results),
-            "reproducibility_stats": self._calculate_reproducibility_stats(execution_results),
-            "triage_notes": self._generate_triage_notes(execution_results),
-            "recommendations": self._generate_recommendations(execution_results),
+            "summary": summary,
+            "test_results": scan.formatted,
+            "reproducibility_stats": repro_stats,
+            "triage_notes": self._generate_triage_notes(scan),
+            "recommendations": self._generate_recommendations(summary, repro_stats),
             "artifacts_summary": self._get_artifacts_summary(session_id)
         }
         
         # Save report to file
         report_path = settings.REPORTS_DIR / f"{session_id}_report.json"
-        report_path.write_text(
-            json.dumps(report, indent=2, default=str),
-            encoding='utf-8'
-        )
+        self._write_report_file(report_path, report)
         report["report_path"] = str(report_path)
+        self._progress.pop(session_id, None)
         
         self.log_info(f"Report generated: {report_path}")
         return report
         
+    def append_result(self, session_id: str, result: Dict) -> Optional[str]:
+        """
+        Add one completed test to the session's progressive report.
+        
+        Keeps running verdict counts so each update is O(1) on the summary,
+        then atomically rewrites the session report file so dashboards can
+        poll partial results while execution continues.
+        
+        Args:
+            session_id: Session identifier
+            result: Execution result for a single test
+            
+        Returns:
+            Path to the progressive report, or None if it could not be written
+        """
+        progress = self._progress.setdefault(
+            session_id, {"counts": Counter(), "test_results": []}
+        )
+        verdict = result.get("verdict", _EMPTY_DICT)
+        progress["counts"][verdict.get("result", "")] += 1
+        progress["test_results"].append(self._format_test_result(result, verdict))
+        
+        total = len(progress["test_results"])
+        report = {
+            "report_id": f"report_{session_id}",
+            "session_id": session_id,
+            "status": "in_progress",
+            "generated_at": datetime.now().isoformat(),
+            "summary": self._generate_summary(progress["counts"], total),
+            "test_results": progress["test_results"]
+        }
+        
+        report_path = settings.REPORTS_DIR / f"{session_id}_report.json"
+        try:
+            self._write_report_file(report_path, report)
+        except OSError as e:
+            self.log_error(f"Failed to write progressive report: {e}")
+            return None
+        return str(report_path)
+        
+    def _write_report_file(self, report_path: Path, report: Dict):
+        """
+        Atomically write a report as JSON.
+        
+        Writes to a unique temp file in the same directory, then swaps it in
+        with os.replace so readers never observe a partially written report.
+        """
+        fd, tmp_path = tempfile.mkstemp(
+            dir=str(report_path.parent),
+            prefix=f"{report_path.name}.",
+            suffix=".tmp"
+        )
+        try:
+            with open(fd, "wb") as fp:
+                fp.write(jsonlib.dump_bytes(report, indent=True))
+            os.replace(tmp_path, report_path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        
     def _extract_game_info(self, game_analysis: Dict) -> Dict:
         """Extract relevant game information for report."""
         return {
@@ -90,25 +207,109 @@ class AnalyzerAgent(BaseAgent):
             "analyzed_at": game_analysis.get("timestamp", "")
         }
         
-    def _generate_summary(self, results: List[Dict]) -> Dict:
-        """Generate executive summary of test results."""
-        total = len(results)
+    def _scan_results(self, results: List[Dict]) -> _ResultScan:
+        """
+        Walk execution results once, accumulating everything the report needs.
+        
+        Args:
+            results: Execution results
+            
+        Returns:
+            Verdict counts, reproducibility aggregates, formatted rows
+            and triage notes bucketed by severity
+        """
+        scan = _ResultScan()
+        
+        for result in results:
+            verdict = result.get("verdict", _EMPTY_DICT)
+            verdict_result = verdict.get("result", "")
+            reproducibility = result.get("reproducibility", 0)
+            cross_validation = result.get("cross_validation", _EMPTY_DICT)
+            runs = result.get("runs") or ()
+            
+            scan.counts[verdict_result] += 1
+            
+            # Reproducibility aggregates
+            if scan.repro_min is None or reproducibility < scan.repro_min:
+                scan.repro_min = reproducibility
+            if scan.repro_max is None or reproducibility > scan.repro_max:
+                scan.repro_max = reproducibility
+            scan.repro_sum += reproducibility
+            if reproducibility >= 90:
+                scan.highly_reproducible += 1
+            if reproducibility < 70:
+                scan.flaky_tests += 1
+                
+            scan.formatted.append(
+                self._format_test_result(result, verdict, cross_validation, runs)
+            )
+            
+            if verdict_result in ["FAIL", "FLAKY"]:
+                note = {
+                    "test_id": result.get("test_id"),
+                    "test_name": result.get("test_name"),
+                    "severity": "HIGH" if verdict_result == "FAIL" else "MEDIUM",
+                    "issue": verdict.get("reason", "Unknown issue"),
+                    "recommended_action": self._get_recommended_action(
+                        verdict_result, reproducibility
+                    ),
+                    "cross_validation_result": cross_validation.get("status", "unknown")
+                }
+                
+                # Add error details if available
+                errors = self._unique_errors(runs)
+                if errors:
+                    note["errors"] = errors
+                    
+                if verdict_result == "FAIL":
+                    scan.triage_high.append(note)
+                else:
+                    scan.triage_medium.append(note)
+                
+        return scan
+        
+    def _unique_errors(self, runs: Sequence[Dict], limit: int = 3) -> List[str]:
+        """Collect up to `limit` distinct run errors in first-seen order."""
+        seen = {}
+        for run in runs:
+            error = run.get("error")
+            if error and error not in seen:
+                seen[error] = None
+                if len(seen) == limit:
+                    break
+        return list(seen)
+        
+    def _format_test_result(
+        self,
+        result: Dict,
+        verdict: Dict,
+        cross_validation: Optional[Dict] = None,
+        runs: Optional[Sequence[Dict]] = None
+    ) -> Dict:
+        """Format an individual test result for the report."""
+        if cross_validation is None:
+            cross_validation = result.get("cross_validation", _EMPTY_DICT)
+        if runs is None:
+            runs = result.get("runs") or ()
+        return {
+            "test_id": result.get("test_id"),
+            "test_name": result.get("test_name"),
+            "verdict": verdict if verdict is not _EMPTY_DICT else {},
+            "reproducibility": result.get("reproducibility", 0),
+            "run_count": len(runs),
+            "cross_validation_agrees": cross_validation.get("agrees_with_primary", False),
+            "executed_at": result.get("executed_at", "")
+        }
         
+    def _generate_summary(self, counts: Counter, total: int) -> Dict:
+        """Generate executive summary from verdict counts."""
         if total == 0:
-            return {
-                "total_tests": 0,
-                "passed": 0,
-                "failed": 0,
-                "flaky": 0,
-                "inconclusive": 0,
-                "pass_rate": 0,
-                "overall_status": "NO_TESTS"
-            }
+            return dict(_EMPTY_SUMMARY)
             
-        passed = sum(1 for r in results if r.get("verdict", {}).get("result") == "PASS")
-        failed = sum(1 for r in results if r.get("verdict", {}).get("result") == "FAIL")
-        flaky = sum(1 for r in results if r.get("verdict", {}).get("result") == "FLAKY")
-        inconclusive = total - passed - failed - flaky
+        passed = counts.get("PASS", 0)
+        failed = counts.get("FAIL", 0)
+        flaky = counts.get("FLAKY", 0)
+        inconclusive = total - sum(counts.get(k, 0) for k in _CONCLUSIVE_VERDICTS)
         
         pass_rate = round((passed / total) * 100, 2) if total > 0 else 0
         
@@ -132,26 +333,9 @@ class AnalyzerAgent(BaseAgent):
             "overall_status": overall_status
         }
         
-    def _format_test_results(self, results: List[Dict]) -> List[Dict]:
-        """Format individual test results for report."""
-        formatted = []
-        
-        for result in results:
-            formatted.append({
-                "test_id": result.get("test_id"),
-                "test_name": result.get("test_name"),
-                "verdict": result.get("verdict", {}),
-                "reproducibility": result.get("reproducibility", 0),
-                "run_count": len(result.get("runs", [])),
-                "cross_validation_agrees": result.get("cross_validation", {}).get("agrees_with_primary", False),
-                "executed_at": result.get("executed_at", "")
-            })
-            
-        return formatted
-        
-    def _calculate_reproducibility_stats(self, results: List[Dict]) -> Dict:
+    def _calculate_reproducibility_stats(self, scan: _ResultScan, total: int) -> Dict:
         """Calculate overall reproducibility statistics."""
-        if not results:
+        if total == 0:
             return {
                 "average_reproducibility": 0,
                 "min_reproducibility": 0,
@@ -160,57 +344,21 @@ class AnalyzerAgent(BaseAgent):
                 "flaky_tests": 0
             }
             
-        reproducibilities = [r.get("reproducibility", 0) for r in results]
-        
-        avg = sum(reproducibilities) / len(reproducibilities)
-        highly_reproducible = sum(1 for r in reproducibilities if r >= 90)
-        flaky_count = sum(1 for r in reproducibilities if r < 70)
-        
         return {
-            "average_reproducibility": round(avg, 2),
-            "min_reproducibility": min(reproducibilities),
-            "max_reproducibility": max(reproducibilities),
-            "highly_reproducible": highly_reproducible,
-            "flaky_tests": flaky_count
+            "average_reproducibility": round(scan.repro_sum / total, 2),
+            "min_reproducibility": scan.repro_min,
+            "max_reproducibility": scan.repro_max,
+            "highly_reproducible": scan.highly_reproducible,
+            "flaky_tests": scan.flaky_tests
         }
         
-    def _generate_triage_notes(self, results: List[Dict]) -> List[Dict]:
-        """Generate triage notes for failed/flaky tests."""
-        notes = []
-        
-        for result in results:
-            verdict = result.get("verdict", {})
-            verdict_result = verdict.get("result", "")
-            
-            if verdict_result in ["FAIL", "FLAKY"]:
-                note = {
-                    "test_id": result.get("test_id"),
-                    "test_name": result.get("test_name"),
-                    "severity": "HIGH" if verdict_result == "FAIL" else "MEDIUM",
-                    "issue": verdict.get("reason", "Unknown issue"),
-                    "recommended_action": self._get_recommended_action(result),
-                    "cross_validation_result": result.get("cross_validation", {}).get("status", "unknown")
-                }
-                
-                # Add error details if available
-                runs = result.get("runs", [])
-                errors = [r.get("error") for r in runs if r.get("error")]
-                if errors:
-                    note["errors"] = list(set(errors))[:3]  # Unique errors, max 3
-                    
-                notes.append(note)
-                
-        # Sort by severity
-        notes.sort(key=lambda x: 0 if x["severity"] == "HIGH" else 1)
-        
-        return notes
+    def _generate_triage_notes(self, scan: _ResultScan) -> List[Dict]:
+        """Order triage notes for failed/flaky tests by severity."""
+        # Notes are already partitioned, so HIGH-first ordering is a concat
+        return scan.triage_high + scan.triage_medium
         
-    def _get_recommended_action(self, result: Dict) -> str:
+    def _get_recommended_action(self, verdict_result: str, reproducibility: float) -> str:
         """Get recommended action for a failed/flaky test."""
-        verdict = result.get("verdict", {})
-        verdict_result = verdict.get("result", "")
-        reproducibility = result.get("reproducibility", 0)
-        
         if verdict_result == "FAIL":
             if reproducibility == 100:
                 return "Consistent failure - investigate root cause immediately"
@@ -224,13 +372,10 @@ class AnalyzerAgent(BaseAgent):
         else:
             return "Review test execution logs"
             
-    def _generate_recommendations(self, results: List[Dict]) -> List[str]:
-        """Generate overall recommendations based on results."""
+    def _generate_recommendations(self, summary: Dict, repro_stats: Dict) -> List[str]:
+        """Generate overall recommendations from summary and reproducibility stats."""
         recommendations = []
         
-        summary = self._generate_summary(results)
-        repro_stats = self._calculate_reproducibility_stats(results)
-        
         # Pass rate recommendations
         if summary["pass_rate"] < 50:
             recommendations.append(
@@ -273,17 +418,18 @@ class AnalyzerAgent(BaseAgent):
         if not artifacts_dir.exists():
             return {"total_artifacts": 0, "types": {}}
             
-        artifacts = list(artifacts_dir.glob("**/*"))
-        files = [f for f in artifacts if f.is_file()]
-        
         # Count by type
+        total_artifacts = 0
         type_counts = {}
-        for f in files:
-            ext = f.suffix[1:] if f.suffix else "other"
+        for name in _iter_file_names(str(artifacts_dir)):
+            stem, _, ext = name.rpartition(".")
+            if not (stem and ext):
+                ext = "other"
             type_counts[ext] = type_counts.get(ext, 0) + 1
+            total_artifacts += 1
             
         return {
-            "total_artifacts": len(files),
+            "total_artifacts": total_artifacts,
             "types": type_counts,
             "directory": str(artifacts_dir)
         }
@@ -39,17 +39,28 @@ class BaseAgent(ABC):
         """
         pass
     
-    def log_info(self, message: str):
-        """Log an info message"""
-        self.logger.info(f"[{self.name}] {message}")
+    def log_info(self, message: str, *args: Any):
+        """Log an info message; args are %-formatted only if emitted"""
+        if args:
+            self.logger.info("[%s] " + message, self.name, *args)
+        else:
+            self.logger.info("[%s] %s", self.name, message)
     
-    def log_error(self, message: str):
-        """Log an error message"""
-        self.logger.error(f"[{self.name}] {message}")
+    def log_error(self, message: str, *args: Any):
+        """Log an error message; args are %-formatted only if emitted"""
+        if args:
+            self.logger.error("[%s] " + message, self.name, *args)
+        else:
+            self.logger.error("[%s] %s", self.name, message)
     
-    def log_debug(self, message: str):
-        """Log a debug message"""
-        self.logger.debug(f"[{self.name}] {message}")
+    def log_debug(self, message: str, *args: Any):
+        """Log a debug message; args are %-formatted only if emitted"""
+        if not self.logger.isEnabledFor(logging.DEBUG):
+            return
+        if args:
+            self.logger.debug("[%s] " + message, self.name, *args)
+        else:
+            self.logger.debug("[%s] %s", self.name, message)
     
     def __repr__(self):
         return f"<{self.__class__.__name__}(name='{self.name}')>"
@@ -2,22 +2,40 @@
 Executor Agent - Executes individual test cases using browser automation
 """
 import asyncio
-import base64
-from typing import Dict, List, Any, Optional
+import re
+import time
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
 
-try:
-    import ollama
-    OLLAMA_AVAILABLE = True
-except ImportError:
-    OLLAMA_AVAILABLE = False
-
 from .base_agent import BaseAgent
 from ..browser.controller import BrowserController
 from ..browser.artifact_capture import ArtifactCapture
 from ..config import settings
 
 
+# Step interpretation patterns, compiled once at import
+_WAIT_RE = re.compile(r'(\d+)\s*(second|ms|millisecond)')
+_START_KEYWORDS = ("start", "play", "begin")
+_RESTART_KEYWORDS = ("restart", "new", "reset")
+
+# Step keyword -> action kind, matched in a single regex scan
+_STEP_KEYWORDS = {
+    "navigate": "navigate",
+    "go to": "navigate",
+    "open": "navigate",
+    "wait": "wait",
+    "click": "click",
+    "verify": "verify",
+    "check": "verify",
+    "type": "type",
+    "input": "type",
+    "enter": "type",
+}
+_STEP_KEYWORD_RE = re.compile("|".join(re.escape(kw) for kw in _STEP_KEYWORDS))
+# Order in which action kinds take precedence when a step mentions several
+_STEP_ACTION_PRIORITY = ("navigate", "wait", "click", "verify", "type")
+
+
 class ExecutorAgent(BaseAgent):
     """
     Executes individual test cases by:
@@ -34,6 +52,18 @@ class ExecutorAgent(BaseAgent):
         )
         self.agent_id = agent_id
         self.model_name = settings.OLLAMA_MODEL
+        # (text_lower, x, y) per analyzed element, rebuilt when the analysis changes
+        self._element_index: List[Tuple[str, Any, Any]] = []
+        self._indexed_analysis: Optional[Dict] = None
+        self._run_label = self.agent_id
+        self._capture_prefix = self.agent_id
+        self._step_handlers = {
+            "navigate": self._interpret_navigate,
+            "wait": self._interpret_wait,
+            "click": self._interpret_click,
+            "verify": self._interpret_verify,
+            "type": self._interpret_type,
+        }
         
     async def execute(self, context: Dict[str, Any]) -> Dict[str, Any]:
         """Execute a test case."""
@@ -51,7 +81,8 @@ class ExecutorAgent(BaseAgent):
         test_case: Dict,
         browser: BrowserController,
         artifact_capture: ArtifactCapture,
-        game_analysis: Dict
+        game_analysis: Dict,
+        run_label: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Execute a single test case.
@@ -61,6 +92,8 @@ class ExecutorAgent(BaseAgent):
             browser: Browser controller
             artifact_capture: Artifact capture instance
             game_analysis: Game analysis for context
+            run_label: Name for this run in results and artifact names;
+                defaults to the agent id
             
         Returns:
             Test execution result
@@ -68,12 +101,15 @@ class ExecutorAgent(BaseAgent):
         test_id = test_case.get("id", 0)
         test_name = test_case.get("name", "Unknown Test")
         
-        self.log_info(f"Executing test {test_id}: {test_name}")
+        self.log_info("Executing test %s: %s", test_id, test_name)
         
+        self.reset_for_test(test_case, game_analysis, run_label)
+        
+        start_ns = time.monotonic_ns()
         result = {
             "test_id": test_id,
             "test_name": test_name,
-            "agent_id": self.agent_id,
+            "agent_id": self._run_label,
             "started_at": datetime.now().isoformat(),
             "steps": [],
             "status": "running",
@@ -81,33 +117,75 @@ class ExecutorAgent(BaseAgent):
             "error": None
         }
         
+        # Previous step's (step_result, capture task) still in flight
+        pending: Optional[Tuple[Dict, asyncio.Task]] = None
+        
         try:
             steps = test_case.get("steps", [])
+            last_screenshot = None
             
             for step_idx, step in enumerate(steps):
-                step_result = await self._execute_step(
-                    step=step,
-                    step_index=step_idx,
-                    browser=browser,
-                    artifact_capture=artifact_capture,
-                    game_analysis=game_analysis,
-                    test_name=test_name
-                )
+                step_result = {
+                    "index": step_idx,
+                    "description": step,
+                    "status": "pending",
+                    "action_taken": None,
+                    "screenshot": None,
+                    "error": None
+                }
+                
+                # Interpret while the previous step's capture is in flight
+                action = None
+                try:
+                    action = await self._interpret_step(step, game_analysis, browser)
+                except Exception as e:
+                    self._fail_step(step_result, e)
+                    
+                # The page must not change until the previous capture is done
+                if pending is not None:
+                    previous_result, capture_task = pending
+                    pending = None
+                    await self._collect_capture(previous_result, capture_task)
+                    if previous_result["status"] == "failed":
+                        break
+                    last_screenshot = previous_result["screenshot"] or last_screenshot
+                    
                 result["steps"].append(step_result)
                 
+                if action is not None:
+                    capture_task = await self._execute_step(
+                        step_result=step_result,
+                        action=action,
+                        browser=browser,
+                        artifact_capture=artifact_capture,
+                        previous_screenshot=last_screenshot
+                    )
+                    if capture_task is not None:
+                        pending = (step_result, capture_task)
+                    else:
+                        last_screenshot = step_result["screenshot"] or last_screenshot
+                        
                 if step_result["status"] == "failed":
-                    result["status"] = "failed"
-                    result["error"] = step_result.get("error", "Step failed")
                     break
                     
-            if result["status"] == "running":
+            if pending is not None:
+                await self._collect_capture(*pending)
+                pending = None
+                
+            failed_step = next(
+                (s for s in result["steps"] if s["status"] == "failed"), None
+            )
+            if failed_step is not None:
+                result["status"] = "failed"
+                result["error"] = failed_step.get("error", "Step failed")
+            else:
                 # All steps passed
                 result["status"] = "passed"
                 
             # Capture final artifacts
             final_artifacts = await artifact_capture.capture_all(
                 browser,
-                f"test_{test_id}_final",
+                f"{self._capture_prefix}_final",
                 len(steps)
             )
             result["artifacts"].append(final_artifacts)
@@ -116,73 +194,91 @@ class ExecutorAgent(BaseAgent):
             self.log_error(f"Test execution failed: {e}")
             result["status"] = "error"
             result["error"] = str(e)
+            if pending is not None:
+                pending[1].cancel()
             
         result["ended_at"] = datetime.now().isoformat()
-        result["duration_ms"] = self._calculate_duration(
-            result["started_at"],
-            result["ended_at"]
-        )
+        result["duration_ms"] = (time.monotonic_ns() - start_ns) // 1_000_000
         
         return result
         
     async def _execute_step(
         self,
-        step: str,
-        step_index: int,
+        step_result: Dict,
+        action: Dict,
         browser: BrowserController,
         artifact_capture: ArtifactCapture,
-        game_analysis: Dict,
-        test_name: str
-    ) -> Dict:
+        previous_screenshot: Optional[str] = None
+    ) -> Optional[asyncio.Task]:
         """
-        Execute a single test step.
+        Perform an interpreted test step and start its artifact capture.
+        
+        The capture runs as a background task so the caller can interpret
+        the next step while it is in flight; the caller must collect it
+        with _collect_capture before performing another action.
         
         Args:
-            step: Step description
-            step_index: Index of the step
+            step_result: Step result to fill in
+            action: Interpreted action for the step
             browser: Browser controller
             artifact_capture: Artifact capture
-            game_analysis: Game analysis
-            test_name: Name of the test
+            previous_screenshot: Screenshot from the last captured step, reused
+                by passive verify steps
             
         Returns:
-            Step execution result
+            The pending capture task, or None if no capture was started
         """
-        step_result = {
-            "index": step_index,
-            "description": step,
-            "status": "pending",
-            "action_taken": None,
-            "screenshot": None,
-            "error": None
-        }
+        step_index = step_result["index"]
+        step_result["action_taken"] = action
         
         try:
-            # Interpret and execute the step
-            action = await self._interpret_step(step, game_analysis, browser)
-            step_result["action_taken"] = action
-            
             # Execute the action
-            await self._perform_action(action, browser)
+            action_type = await self._perform_action(action, browser)
             
+            if action_type == "verify" and previous_screenshot:
+                # Verify is passive: the page has not changed since the last
+                # capture, and the final capture records the end state anyway
+                step_result["screenshot"] = previous_screenshot
+                step_result["status"] = "passed"
+                return None
+                
             # Wait for any animations/transitions
             await browser.wait_for_timeout(500)
             
+            step_result["status"] = "passed"
+            
             # Capture artifacts for this step
-            artifacts = await artifact_capture.capture_all(
-                browser,
-                f"step_{step_index}",
-                step_index
+            return asyncio.create_task(
+                artifact_capture.capture_all(
+                    browser,
+                    f"{self._capture_prefix}_step_{step_index}",
+                    step_index
+                )
             )
-            step_result["screenshot"] = artifacts.get("screenshot")
-            step_result["status"] = "passed"
             
         except Exception as e:
-            step_result["status"] = "failed"
-            step_result["error"] = str(e)
-            self.log_error(f"Step {step_index} failed: {e}")
+            self._fail_step(step_result, e)
+            return None
+            
+    async def _collect_capture(self, step_result: Dict, capture_task: asyncio.Task):
+        """
+        Wait for a step's artifact capture and record its screenshot.
+        
+        Args:
+            step_result: Step result the capture belongs to
+            capture_task: Pending capture task
+        """
+        try:
+            artifacts = await capture_task
+            step_result["screenshot"] = artifacts.get("screenshot")
+        except Exception as e:
+            self._fail_step(step_result, e)
             
-        return step_result
+    def _fail_step(self, step_result: Dict, error: Exception):
+        """Mark a step as failed."""
+        step_result["status"] = "failed"
+        step_result["error"] = str(error)
+        self.log_error(f"Step {step_result['index']} failed: {error}")
         
     async def _interpret_step(
         self,
@@ -203,86 +299,145 @@ class ExecutorAgent(BaseAgent):
         """
         step_lower = step.lower()
         
-        # Rule-based interpretation for common actions
-        if "navigate" in step_lower or "go to" in step_lower or "open" in step_lower:
-            url = game_analysis.get("url", "")
-            return {"type": "navigate", "url": url}
-            
-        if "wait" in step_lower:
-            # Extract wait time if specified
-            import re
-            match = re.search(r'(\d+)\s*(second|ms|millisecond)', step_lower)
-            if match:
-                time = int(match.group(1))
-                if "second" in match.group(2):
-                    time *= 1000
-                return {"type": "wait", "ms": time}
-            return {"type": "wait", "ms": 1000}
+        # Rule-based interpretation: one regex scan finds every action
+        # keyword, then the highest-priority action kind wins
+        found = {_STEP_KEYWORDS[kw] for kw in _STEP_KEYWORD_RE.findall(step_lower)}
+        for kind in _STEP_ACTION_PRIORITY:
+            if kind in found:
+                return self._step_handlers[kind](step, step_lower, game_analysis)
+                
+        # Default: treat as a verification step
+        return {"type": "verify", "description": step}
+        
+    def _interpret_navigate(self, step: str, step_lower: str, game_analysis: Dict) -> Dict:
+        """Interpret a navigation step."""
+        url = game_analysis.get("url", "")
+        return {"type": "navigate", "url": url}
+        
+    def _interpret_wait(self, step: str, step_lower: str, game_analysis: Dict) -> Dict:
+        """Interpret a wait step."""
+        # Extract wait time if specified
+        match = _WAIT_RE.search(step_lower)
+        if match:
+            time = int(match.group(1))
+            if "second" in match.group(2):
+                time *= 1000
+            return {"type": "wait", "ms": time}
+        return {"type": "wait", "ms": 1000}
+        
+    def _interpret_click(self, step: str, step_lower: str, game_analysis: Dict) -> Dict:
+        """Interpret a click step, resolving a target element if possible."""
+        # Try to find what to click
+        elements = self._element_index
+        
+        # Look for button mentions
+        match = None
+        if "start" in step_lower or "play" in step_lower:
+            match = self._find_element(_START_KEYWORDS)
             
-        if "click" in step_lower:
-            # Try to find what to click
-            elements = game_analysis.get("elements", [])
+        if match is None and ("restart" in step_lower or "new game" in step_lower):
+            match = self._find_element(_RESTART_KEYWORDS)
             
-            # Look for button mentions
-            if "start" in step_lower or "play" in step_lower:
-                for el in elements:
-                    if any(kw in el.get("text", "").lower() for kw in ["start", "play", "begin"]):
-                        return {
-                            "type": "click",
-                            "target": {"x": el.get("x"), "y": el.get("y")},
-                            "selector": None
-                        }
-                        
-            if "restart" in step_lower or "new game" in step_lower:
-                for el in elements:
-                    if any(kw in el.get("text", "").lower() for kw in ["restart", "new", "reset"]):
-                        return {
-                            "type": "click",
-                            "target": {"x": el.get("x"), "y": el.get("y")},
-                            "selector": None
-                        }
-                        
-            # Generic button click
-            if "button" in step_lower:
-                return {"type": "click", "selector": "button"}
-                
-            # Click first available element
-            if elements:
-                el = elements[0]
-                return {
-                    "type": "click",
-                    "target": {"x": el.get("x"), "y": el.get("y")},
-                    "selector": None
-                }
-                
-            return {"type": "click", "selector": "button, [role='button'], .clickable"}
+        if match is not None:
+            _, x, y = match
+            return {
+                "type": "click",
+                "target": {"x": x, "y": y},
+                "selector": None
+            }
             
-        if "verify" in step_lower or "check" in step_lower:
-            return {"type": "verify", "description": step}
+        # Generic button click
+        if "button" in step_lower:
+            return {"type": "click", "selector": "button"}
             
-        if "type" in step_lower or "input" in step_lower or "enter" in step_lower:
-            return {"type": "type", "selector": "input", "text": "test"}
+        # Click first available element
+        if elements:
+            _, x, y = elements[0]
+            return {
+                "type": "click",
+                "target": {"x": x, "y": y},
+                "selector": None
+            }
             
-        # Default: treat as a verification step
+        return {"type": "click", "selector": "button, [role='button'], .clickable"}
+        
+    def _interpret_verify(self, step: str, step_lower: str, game_analysis: Dict) -> Dict:
+        """Interpret a verification step."""
         return {"type": "verify", "description": step}
         
+    def _interpret_type(self, step: str, step_lower: str, game_analysis: Dict) -> Dict:
+        """Interpret a text-entry step."""
+        return {"type": "type", "selector": "input", "text": "test"}
+        
+    def _find_element(self, keywords: Tuple[str, ...]) -> Optional[Tuple[str, Any, Any]]:
+        """Return the first indexed element whose text contains any keyword."""
+        return next(
+            (
+                entry for entry in self._element_index
+                if any(kw in entry[0] for kw in keywords)
+            ),
+            None
+        )
+        
+    def reset_for_test(
+        self,
+        test_case: Dict,
+        game_analysis: Dict,
+        run_label: Optional[str] = None
+    ):
+        """
+        Prepare per-test state so one executor can be reused across runs.
+        
+        Args:
+            test_case: Test case about to run
+            game_analysis: Game analysis for context
+            run_label: Name for this run; defaults to the agent id
+        """
+        # Lowercase element text once per analysis instead of on every step
+        if game_analysis is not self._indexed_analysis:
+            self._element_index = self._build_element_index(game_analysis)
+            self._indexed_analysis = game_analysis
+            
+        # Runs of the same test execute concurrently, so artifact names
+        # carry the test and run to stay unique
+        self._run_label = run_label or self.agent_id
+        self._capture_prefix = f"test_{test_case.get('id', 0)}_{self._run_label}"
+        
+    def _build_element_index(self, game_analysis: Dict) -> List[Tuple[str, Any, Any]]:
+        """
+        Flatten analyzed elements into (text_lower, x, y) tuples.
+        
+        Args:
+            game_analysis: Game analysis containing the element list
+            
+        Returns:
+            Element index used by step interpretation
+        """
+        return [
+            ((el.get("text") or "").lower(), el.get("x"), el.get("y"))
+            for el in game_analysis.get("elements", [])
+        ]
+        
     async def _perform_action(
         self,
         action: Dict,
         browser: BrowserController
-    ):
+    ) -> Optional[str]:
         """
         Perform a browser action.
         
         Args:
             action: Action dictionary with type and parameters
             browser: Browser controller
+            
+        Returns:
+            The action type that was performed
         """
         action_type = action.get("type")
         
         if action_type == "navigate":
             await browser.navigate(action.get("url", ""))
-            await browser.wait_for_timeout(2000)
+            await browser.wait_until_ready()
             
         elif action_type == "click":
             if action.get("target"):
@@ -315,11 +470,4 @@ class ExecutorAgent(BaseAgent):
         elif action_type == "press_key":
             await browser.press_key(action.get("key", "Enter"))
             
-    def _calculate_duration(self, start: str, end: str) -> int:
-        """Calculate duration in milliseconds."""
-        try:
-            start_dt = datetime.fromisoformat(start)
-            end_dt = datetime.fromisoformat(end)
-            return int((end_dt - start_dt).total_seconds() * 1000)
-        except:
-            return 0
+        return action_type
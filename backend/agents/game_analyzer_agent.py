@@ -1,24 +1,90 @@
 """
 Game Analyzer Agent - Uses vision model to understand game mechanics
 """
+import asyncio
 import base64
-import json
+import copy
 from pathlib import Path
 from typing import Dict, List, Any, Optional
-from datetime import datetime
+from functools import lru_cache
 
 try:
-    import ollama
-    OLLAMA_AVAILABLE = True
+    import aiofiles
+    AIOFILES_AVAILABLE = True
 except ImportError:
-    OLLAMA_AVAILABLE = False
+    AIOFILES_AVAILABLE = False
 
 from .base_agent import BaseAgent
 from ..browser.controller import BrowserController
 from ..rag.knowledge_base import KnowledgeBase
+from ..utils.cache import TTLCache
+from ..utils import jsonlib
+from ..utils.helpers import timestamp_now
 from ..config import settings
 
 
+# Static recommendation templates, shared by reference between analyses;
+# consumers only read them (planner prompt, API response)
+_SCORE_RECOMMENDATION = {
+    "category": "Functionality",
+    "name": "Verify score updates correctly",
+    "priority": "high",
+    "description": "Perform game actions and verify score changes"
+}
+
+_NUMBER_RECOMMENDATION = {
+    "category": "Functionality",
+    "name": "Test number matching/calculation",
+    "priority": "high",
+    "description": "Test valid and invalid number combinations"
+}
+
+_ALWAYS_RECOMMENDATIONS = (
+    {"category": "UI", "name": "Test game start/restart", "priority": "high", "description": "Verify game can be started and restarted"},
+    {"category": "Edge Case", "name": "Test rapid clicking", "priority": "medium", "description": "Rapidly click elements to test debouncing"},
+    {"category": "UI", "name": "Test modal dialogs", "priority": "medium", "description": "Verify popups and modals work correctly"}
+)
+
+_DEFAULT_RECOMMENDATIONS = (
+    {"category": "UI", "name": "Test page load", "priority": "high", "description": "Verify game loads correctly"},
+    {"category": "UI", "name": "Test interactive elements", "priority": "high", "description": "Click all visible buttons"},
+    {"category": "Functionality", "name": "Test game mechanics", "priority": "high", "description": "Perform basic game actions"},
+    {"category": "UI", "name": "Test navigation", "priority": "medium", "description": "Test any navigation elements"},
+    {"category": "Edge Case", "name": "Test error handling", "priority": "low", "description": "Verify graceful error handling"}
+)
+
+# Expensive analysis results keyed by (url, DOM length, DOM hash), shared across
+# agent instances since the API creates a new agent per request
+_analysis_cache = TTLCache(maxsize=128, ttl=300)
+
+# KB pattern searches; queries are templated from a handful of game types
+_pattern_cache = TTLCache(maxsize=64, ttl=300)
+
+
+@lru_cache(maxsize=1)
+def _get_ollama():
+    """Import ollama on first use; returns None when it is not installed."""
+    try:
+        import ollama
+    except ImportError:
+        return None
+    return ollama
+
+
+@lru_cache(maxsize=1)
+def _get_ollama_client():
+    """Shared async client; None when this ollama release has no AsyncClient."""
+    ollama = _get_ollama()
+    if ollama is None or not hasattr(ollama, "AsyncClient"):
+        return None
+    return ollama.AsyncClient(host=settings.OLLAMA_HOST)
+
+
+def _encode_image_b64(image: bytes) -> str:
+    """Encode image bytes as base64 text for the ollama images field."""
+    return base64.b64encode(image).decode()
+
+
 class GameAnalyzerAgent(BaseAgent):
     """
     Analyzes games using vision-based AI to understand:
@@ -66,7 +132,7 @@ class GameAnalyzerAgent(BaseAgent):
         analysis = {
             "url": url,
             "session_id": session_id,
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": timestamp_now(),
             "game_type": "unknown",
             "elements": [],
             "mechanics": [],
@@ -75,48 +141,69 @@ class GameAnalyzerAgent(BaseAgent):
             "element_count": 0
         }
         
+        persist_task = None
+        
         try:
             # Navigate to game
             await browser.navigate(url)
-            await browser.wait_for_timeout(2000)  # Wait for game to load
+            await browser.wait_until_ready()  # Wait for game to load
+            
+            # Query the page snapshot, a DOM fingerprint and the initial
+            # screenshot together; the HTML itself is only transferred when
+            # the heuristic analysis needs it
+            snapshot, fingerprint, screenshot = await asyncio.gather(
+                browser.snapshot_page(),
+                browser.get_dom_fingerprint(),
+                browser.screenshot_bytes()
+            )
             
-            # Capture initial screenshot
-            screenshot_path = settings.ARTIFACTS_DIR / session_id
-            screenshot_path.mkdir(parents=True, exist_ok=True)
-            initial_screenshot = str(screenshot_path / "initial_analysis.png")
-            await browser.screenshot(initial_screenshot)
+            # Every session keeps its initial screenshot, cached analysis or
+            # not; the artifact is written in the background
+            initial_screenshot = settings.ARTIFACTS_DIR / session_id / "initial_analysis.png"
+            persist_task = asyncio.create_task(
+                self._persist_screenshot(initial_screenshot, screenshot)
+            )
             
-            # Get interactive elements
-            interactive_elements = await browser.find_interactive_elements()
+            interactive_elements = snapshot["interactive_elements"]
+            game_state = browser.game_state_from_snapshot(snapshot)
             analysis["elements"] = interactive_elements
             analysis["element_count"] = len(interactive_elements)
-            
-            # Get game state
-            game_state = await browser.get_game_state()
             analysis["initial_state"] = game_state
+            analysis["dom_size"] = fingerprint["length"]
             
-            # Get DOM structure
-            dom = await browser.get_dom()
-            analysis["dom_size"] = len(dom)
-            
+            # Same page content analyzed recently: reuse the expensive results
+            cache_key = (url, fingerprint["length"], fingerprint["hash"])
+            cached = _analysis_cache.get(cache_key)
+            if cached is not None:
+                analysis.update(copy.deepcopy(cached))
+                await persist_task
+                self.log_info(f"Analysis cache hit: {analysis['game_type']} game with {analysis['element_count']} elements")
+                return analysis
+                
             # Use vision model to analyze screenshot
-            if OLLAMA_AVAILABLE:
-                vision_analysis = await self._analyze_screenshot(initial_screenshot)
-                analysis.update(vision_analysis)
+            if _get_ollama() is not None:
+                derived = await self._analyze_screenshot(screenshot)
             else:
                 # Fallback to heuristic analysis
-                analysis.update(self._heuristic_analysis(interactive_elements, game_state, dom))
+                dom = await browser.get_dom()
+                derived = self._heuristic_analysis(interactive_elements, game_state, dom)
+            analysis.update(derived)
             
             # Search knowledge base for similar patterns
-            patterns = self.knowledge_base.search_patterns(
-                f"{analysis['game_type']} game testing",
-                n_results=3
-            )
+            patterns = await self._search_patterns(f"{analysis['game_type']} game testing")
             if patterns:
                 analysis["related_patterns"] = [p.get("content", str(p)) for p in patterns]
+                derived["related_patterns"] = analysis["related_patterns"]
             
             # Generate test recommendations
             analysis["test_recommendations"] = self._generate_recommendations(analysis)
+            derived["test_recommendations"] = analysis["test_recommendations"]
+            
+            # Degraded vision results are not worth replaying
+            if "vision_error" not in derived:
+                _analysis_cache.set(cache_key, copy.deepcopy(derived))
+                
+            await persist_task
             
             self.log_info(f"Analysis complete: {analysis['game_type']} game with {analysis['element_count']} elements")
             
@@ -126,23 +213,65 @@ class GameAnalyzerAgent(BaseAgent):
             # Provide fallback analysis
             analysis["game_type"] = "puzzle"
             analysis["test_recommendations"] = self._get_default_recommendations()
+            if persist_task is not None:
+                await persist_task
             
         return analysis
         
-    async def _analyze_screenshot(self, screenshot_path: str) -> Dict[str, Any]:
+    async def _search_patterns(self, query: str, n_results: int = 3) -> List[Dict]:
+        """
+        Search the knowledge base, reusing recent results for the same query.
+        
+        The search itself (embedding plus vector query) runs in a worker
+        thread so it does not block the event loop.
+        
+        Args:
+            query: Search query
+            n_results: Number of results to return
+            
+        Returns:
+            List of matching patterns
+        """
+        key = (query, n_results)
+        patterns = _pattern_cache.get(key)
+        if patterns is None:
+            patterns = await asyncio.to_thread(
+                self.knowledge_base.search_patterns, query, n_results=n_results
+            )
+            _pattern_cache.set(key, patterns)
+        return patterns
+        
+    async def _persist_screenshot(self, path: Path, image: bytes):
+        """
+        Write a captured screenshot to the artifacts directory.
+        
+        Args:
+            path: Destination file path
+            image: PNG image bytes
+        """
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if AIOFILES_AVAILABLE:
+                async with aiofiles.open(path, "wb") as f:
+                    await f.write(image)
+            else:
+                await asyncio.to_thread(path.write_bytes, image)
+        except OSError as e:
+            self.log_error(f"Failed to save screenshot {path}: {e}")
+            
+    async def _analyze_screenshot(self, screenshot: bytes) -> Dict[str, Any]:
         """
         Use vision model to analyze game screenshot.
         
         Args:
-            screenshot_path: Path to screenshot file
+            screenshot: PNG screenshot bytes
             
         Returns:
             Dictionary with vision analysis results
         """
         try:
-            # Read and encode image
-            with open(screenshot_path, "rb") as f:
-                image_data = base64.b64encode(f.read()).decode()
+            # Encode image off the event loop
+            image_data = await asyncio.to_thread(_encode_image_b64, screenshot)
             
             prompt = """Analyze this game screenshot and provide:
 1. Game Type: What type of game is this? (puzzle, math, matching, card, etc.)
@@ -160,28 +289,35 @@ Respond in JSON format:
     "key_elements": ["list of key interactive elements"]
 }"""
             
-            response = ollama.chat(
-                model=self.ollama_model,
-                messages=[{
-                    "role": "user",
-                    "content": prompt,
-                    "images": [image_data]
-                }]
-            )
+            messages = [{
+                "role": "user",
+                "content": prompt,
+                "images": [image_data]
+            }]
+            
+            # Keep the event loop free while the model runs; concurrent
+            # requests are scheduled by the Ollama server (OLLAMA_NUM_PARALLEL)
+            client = _get_ollama_client()
+            if client is not None:
+                response = await client.chat(
+                    model=self.ollama_model, messages=messages, format="json"
+                )
+            else:
+                response = await asyncio.to_thread(
+                    _get_ollama().chat,
+                    model=self.ollama_model,
+                    messages=messages,
+                    format="json"
+                )
             
             # Parse response
             content = response["message"]["content"]
             
-            # Try to extract JSON from response
-            try:
-                # Find JSON in response
-                start = content.find("{")
-                end = content.rfind("}") + 1
-                if start >= 0 and end > start:
-                    parsed = json.loads(content[start:end])
-                    return parsed
-            except:
-                pass
+            # JSON mode normally returns a bare object; older servers may
+            # still wrap it in prose
+            parsed = jsonlib.extract(content, dict)
+            if parsed is not None:
+                return parsed
             
             # Return raw analysis if JSON parsing fails
             return {
@@ -268,67 +404,34 @@ Respond in JSON format:
         Returns:
             List of test recommendations
         """
-        recommendations = []
-        
         game_type = analysis.get("game_type", "puzzle")
         mechanics = analysis.get("mechanics", [])
+        if isinstance(mechanics, str):
+            mechanics = [mechanics]
+        # Vision models phrase mechanics freely, so match within each phrase
+        mechanic_set = {str(m).lower() for m in mechanics}
         elements = analysis.get("elements", [])
         
         # UI element tests
-        recommendations.append({
+        recommendations = [{
             "category": "UI",
             "name": "Verify all interactive elements are clickable",
             "priority": "high",
             "description": f"Test clicking each of the {len(elements)} interactive elements"
-        })
+        }]
         
         # Based on mechanics
-        if "scoring system" in str(mechanics).lower():
-            recommendations.append({
-                "category": "Functionality",
-                "name": "Verify score updates correctly",
-                "priority": "high",
-                "description": "Perform game actions and verify score changes"
-            })
-            
-        if "number" in str(mechanics).lower() or game_type == "math":
-            recommendations.append({
-                "category": "Functionality",
-                "name": "Test number matching/calculation",
-                "priority": "high",
-                "description": "Test valid and invalid number combinations"
-            })
+        if any("scoring system" in m for m in mechanic_set):
+            recommendations.append(_SCORE_RECOMMENDATION)
+            
+        if game_type == "math" or any("number" in m for m in mechanic_set):
+            recommendations.append(_NUMBER_RECOMMENDATION)
             
         # Always include
-        recommendations.append({
-            "category": "UI",
-            "name": "Test game start/restart",
-            "priority": "high",
-            "description": "Verify game can be started and restarted"
-        })
-        
-        recommendations.append({
-            "category": "Edge Case",
-            "name": "Test rapid clicking",
-            "priority": "medium",
-            "description": "Rapidly click elements to test debouncing"
-        })
-        
-        recommendations.append({
-            "category": "UI",
-            "name": "Test modal dialogs",
-            "priority": "medium",
-            "description": "Verify popups and modals work correctly"
-        })
+        recommendations.extend(_ALWAYS_RECOMMENDATIONS)
         
         return recommendations
         
     def _get_default_recommendations(self) -> List[Dict]:
         """Get default test recommendations when analysis fails."""
-        return [
-            {"category": "UI", "name": "Test page load", "priority": "high", "description": "Verify game loads correctly"},
-            {"category": "UI", "name": "Test interactive elements", "priority": "high", "description": "Click all visible buttons"},
-            {"category": "Functionality", "name": "Test game mechanics", "priority": "high", "description": "Perform basic game actions"},
-            {"category": "UI", "name": "Test navigation", "priority": "medium", "description": "Test any navigation elements"},
-            {"category": "Edge Case", "name": "Test error handling", "priority": "low", "description": "Verify graceful error handling"}
-        ]
+        return list(_DEFAULT_RECOMMENDATIONS)
@@ -2,8 +2,9 @@
 Orchestrator Agent - Coordinates multi-agent test execution
 """
 import asyncio
-from typing import Dict, List, Any, Optional
-from datetime import datetime
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import Dict, List, Any, Optional, AsyncIterator, Tuple
 
 from .base_agent import BaseAgent
 from .executor_agent import ExecutorAgent
@@ -12,6 +13,38 @@ from ..browser.controller import BrowserController
 from ..browser.artifact_capture import ArtifactCapture
 from ..rag.knowledge_base import KnowledgeBase
 from ..config import settings
+from ..utils.helpers import timestamp_now
+
+
+def _base_verdict(passed: int, failed: int, total: int) -> Tuple[str, int, str]:
+    """
+    Verdict from run counts, before the cross-validation adjustment.
+    
+    Args:
+        passed: Runs that passed
+        failed: Runs that failed
+        total: Runs with any status
+        
+    Returns:
+        (result, confidence, reason)
+    """
+    if passed == total:
+        return "PASS", 100, f"All {total} runs passed"
+    if failed == total:
+        return "FAIL", 100, f"All {total} runs failed"
+    if passed > failed:
+        return "FLAKY", int((passed / total) * 100), f"Inconsistent: {passed}/{total} passed"
+    return "FAIL", int((failed / total) * 100), f"Majority failed: {failed}/{total}"
+
+
+# Every outcome possible with the configured repeat count, keyed by
+# (passed, failed, total); other counts fall back to _base_verdict
+_VERDICT_TABLE = {
+    (passed, failed, total): _base_verdict(passed, failed, total)
+    for total in range(1, settings.REPEAT_VALIDATION_COUNT + 1)
+    for passed in range(total + 1)
+    for failed in range(total - passed + 1)
+}
 
 
 class OrchestratorAgent(BaseAgent):
@@ -31,6 +64,10 @@ class OrchestratorAgent(BaseAgent):
         )
         self.num_executors = num_executors
         self.knowledge_base = KnowledgeBase()
+        self.analyzer = AnalyzerAgent()
+        # Long-lived (browser, executor) pairs shared by all runs;
+        # created per execute_tests
+        self._browser_pool: Optional[asyncio.Queue] = None
         
     async def execute(self, context: Dict[str, Any]) -> Dict[str, Any]:
         """Execute orchestration."""
@@ -62,25 +99,58 @@ class OrchestratorAgent(BaseAgent):
         """
         self.log_info(f"Starting execution of {len(tests)} tests for session {session_id}")
         
-        all_results = []
-        
         # Create artifact capture for session
         artifact_capture = ArtifactCapture(session_id)
         
-        # Execute tests with repeat validation
-        for test in tests:
-            test_results = await self._execute_with_validation(
-                test=test,
-                url=url,
-                game_analysis=game_analysis,
-                artifact_capture=artifact_capture,
-                session_id=session_id
-            )
-            all_results.append(test_results)
+        # Launch browsers once for the whole session
+        await self._ensure_pool()
+        
+        # Bound how many tests run at once; each test fans out its own runs
+        semaphore = asyncio.Semaphore(self.num_executors)
+        
+        # Learning records are written to the knowledge base in one batch
+        learning_records: List[Dict] = []
+        
+        async def run_test(test: Dict) -> Dict:
+            async with semaphore:
+                test_results = await self._execute_with_validation(
+                    test=test,
+                    url=url,
+                    game_analysis=game_analysis,
+                    artifact_capture=artifact_capture,
+                    session_id=session_id
+                )
+                
+            # Publish partial results as each test completes
+            self.analyzer.append_result(session_id, test_results)
             
-            # Store results in knowledge base for learning
-            self._record_for_learning(url, test, test_results)
+            # Queue results for the knowledge base
+            record = self._learning_record(url, test, test_results)
+            if record is not None:
+                learning_records.append(record)
+            return test_results
             
+        # Execute tests with repeat validation; gather keeps input order.
+        # Every test is left to finish before the pool shuts down, so one
+        # failure cannot close browsers that sibling tests still hold
+        try:
+            outcomes = await asyncio.gather(
+                *(run_test(test) for test in tests),
+                return_exceptions=True
+            )
+        finally:
+            await self._shutdown_pool()
+            await asyncio.to_thread(artifact_capture.flush)
+            
+        for outcome in outcomes:
+            if isinstance(outcome, BaseException):
+                raise outcome
+        all_results = list(outcomes)
+        
+        # Store results in knowledge base for learning; the write blocks on
+        # disk and embedding, so it runs in a worker thread
+        await asyncio.to_thread(self._record_for_learning, learning_records)
+        
         self.log_info(f"Completed execution of {len(all_results)} tests")
         return all_results
         
@@ -108,120 +178,220 @@ class OrchestratorAgent(BaseAgent):
         test_id = test.get("id", 0)
         test_name = test.get("name", "Unknown")
         
-        self.log_info(f"Executing test {test_id} with repeat validation")
+        self.log_info("Executing test %s with repeat validation", test_id)
         
-        runs = []
         repeat_count = settings.REPEAT_VALIDATION_COUNT
         
-        # Perform repeat validation (run same test multiple times)
-        for run_idx in range(repeat_count):
-            self.log_info(f"  Run {run_idx + 1}/{repeat_count} for test {test_id}")
-            
-            browser = BrowserController()
-            executor = ExecutorAgent(agent_id=f"exec_{run_idx}")
+        # Perform repeat validation (run same test multiple times, concurrently)
+        primary_runs = asyncio.gather(*(
+            self._single_run(
+                run_idx=run_idx,
+                repeat_count=repeat_count,
+                test=test,
+                url=url,
+                game_analysis=game_analysis,
+                artifact_capture=artifact_capture
+            )
+            for run_idx in range(repeat_count)
+        ))
+        
+        # Cross-agent validation (use different executor) alongside the runs
+        runs, cross_validation = await asyncio.gather(
+            primary_runs,
+            self._cross_agent_validate(
+                test=test,
+                url=url,
+                game_analysis=game_analysis,
+                artifact_capture=artifact_capture
+            )
+        )
+        runs = list(runs)
+        if "error" not in cross_validation:
+            cross_validation["primary_statuses"] = [r.get("status") for r in runs]
+        
+        # Determine final verdict
+        status_counts = self._status_counts(runs)
+        verdict = self._determine_verdict(status_counts, cross_validation)
+        
+        return {
+            "test_id": test_id,
+            "test_name": test_name,
+            "runs": runs,
+            "cross_validation": cross_validation,
+            "verdict": verdict,
+            "reproducibility": self._calculate_reproducibility(status_counts),
+            "executed_at": timestamp_now()
+        }
+        
+    async def _single_run(
+        self,
+        run_idx: int,
+        repeat_count: int,
+        test: Dict,
+        url: str,
+        game_analysis: Dict,
+        artifact_capture: ArtifactCapture
+    ) -> Dict:
+        """
+        Execute one repeat-validation run in its own browser.
+        
+        Args:
+            run_idx: Index of this run
+            repeat_count: Total number of repeat runs
+            test: Test case to execute
+            url: Game URL
+            game_analysis: Game analysis
+            artifact_capture: Artifact capture instance
             
-            try:
-                await browser.start()
-                
+        Returns:
+            Run result; failures are reported as an "error" run, never raised
+        """
+        test_id = test.get("id", 0)
+        self.log_info("  Run %d/%d for test %s", run_idx + 1, repeat_count, test_id)
+        
+        try:
+            async with self._acquire_browser() as (browser, executor):
                 # Navigate to game first
                 await browser.navigate(url)
-                await browser.wait_for_timeout(2000)
+                await browser.wait_until_ready(self._ready_selector(game_analysis))
                 
                 # Execute test
                 result = await executor.execute_test(
                     test_case=test,
                     browser=browser,
                     artifact_capture=artifact_capture,
-                    game_analysis=game_analysis
+                    game_analysis=game_analysis,
+                    run_label=f"exec_{run_idx}"
                 )
                 
-                result["run_index"] = run_idx
-                runs.append(result)
-                
-            except Exception as e:
-                self.log_error(f"Run {run_idx} failed: {e}")
-                runs.append({
-                    "run_index": run_idx,
-                    "status": "error",
-                    "error": str(e)
-                })
-                
-            finally:
-                await browser.stop()
-                
-            # Small delay between runs
-            await asyncio.sleep(1)
+            result["run_index"] = run_idx
+            return result
+            
+        except Exception as e:
+            self.log_error(f"Run {run_idx} failed: {e}")
+            return {
+                "run_index": run_idx,
+                "status": "error",
+                "error": str(e)
+            }
             
-        # Cross-agent validation (use different executor)
-        cross_validation = await self._cross_agent_validate(
-            test=test,
-            url=url,
-            game_analysis=game_analysis,
-            artifact_capture=artifact_capture,
-            primary_results=runs
+    def _ready_selector(self, game_analysis: Dict) -> Optional[str]:
+        """
+        Pick a selector that signals the game has rendered.
+        
+        Args:
+            game_analysis: Game analysis with the elements found on load
+            
+        Returns:
+            Selector for the first analyzed element with an id, or None
+        """
+        element_id = next(
+            (el["id"] for el in game_analysis.get("elements", []) if el.get("id")),
+            None
         )
+        if element_id is None:
+            return None
+        escaped = element_id.replace("\\", "\\\\").replace('"', '\\"')
+        return f'[id="{escaped}"]'
         
-        # Determine final verdict
-        verdict = self._determine_verdict(runs, cross_validation)
+    async def _ensure_pool(self):
+        """Start num_executors browsers and queue them, each paired with an executor."""
+        if self._browser_pool is not None:
+            return
+            
+        browsers = [BrowserController() for _ in range(self.num_executors)]
+        try:
+            await asyncio.gather(*(browser.start() for browser in browsers))
+        except Exception:
+            await asyncio.gather(
+                *(browser.stop() for browser in browsers),
+                return_exceptions=True
+            )
+            raise
+            
+        pool: asyncio.Queue = asyncio.Queue()
+        for i, browser in enumerate(browsers):
+            pool.put_nowait((browser, ExecutorAgent(agent_id=f"pool_{i}")))
+        self._browser_pool = pool
         
-        return {
-            "test_id": test_id,
-            "test_name": test_name,
-            "runs": runs,
-            "cross_validation": cross_validation,
-            "verdict": verdict,
-            "reproducibility": self._calculate_reproducibility(runs),
-            "executed_at": datetime.now().isoformat()
-        }
+    @asynccontextmanager
+    async def _acquire_browser(self) -> AsyncIterator[Tuple[BrowserController, ExecutorAgent]]:
+        """
+        Borrow a browser and its executor from the pool, resetting the
+        browser to a clean page on return.
         
+        The pair always goes back into the pool so waiting runs cannot
+        starve; if the reset fails the browser is relaunched instead.
+        """
+        browser, executor = await self._browser_pool.get()
+        try:
+            yield browser, executor
+        finally:
+            try:
+                await browser.reset()
+            except Exception as e:
+                self.log_error(f"Browser reset failed, relaunching: {e}")
+                try:
+                    await browser.stop()
+                    await browser.start()
+                except Exception as e:
+                    self.log_error(f"Browser relaunch failed: {e}")
+            self._browser_pool.put_nowait((browser, executor))
+            
+    async def _shutdown_pool(self):
+        """Stop every pooled browser."""
+        pool, self._browser_pool = self._browser_pool, None
+        if pool is None:
+            return
+            
+        browsers = []
+        while not pool.empty():
+            browser, _ = pool.get_nowait()
+            browsers.append(browser)
+        await asyncio.gather(
+            *(browser.stop() for browser in browsers),
+            return_exceptions=True
+        )
+            
     async def _cross_agent_validate(
         self,
         test: Dict,
         url: str,
         game_analysis: Dict,
-        artifact_capture: ArtifactCapture,
-        primary_results: List[Dict]
+        artifact_capture: ArtifactCapture
     ) -> Dict:
         """
         Perform cross-agent validation using a different executor.
         
+        Runs independently of the primary runs; agreement with them is
+        decided in _determine_verdict.
+        
         Args:
             test: Test case
             url: Game URL
             game_analysis: Game analysis
             artifact_capture: Artifact capture
-            primary_results: Results from primary executor
             
         Returns:
             Cross-validation result
         """
-        self.log_info(f"Performing cross-agent validation for test {test.get('id')}")
-        
-        browser = BrowserController()
-        cross_executor = ExecutorAgent(agent_id="cross_validator")
+        self.log_info("Performing cross-agent validation for test %s", test.get("id"))
         
         try:
-            await browser.start()
-            await browser.navigate(url)
-            await browser.wait_for_timeout(2000)
-            
-            result = await cross_executor.execute_test(
-                test_case=test,
-                browser=browser,
-                artifact_capture=artifact_capture,
-                game_analysis=game_analysis
-            )
-            
-            # Compare with primary results
-            primary_status = [r.get("status") for r in primary_results]
-            cross_status = result.get("status")
-            
-            agreement = all(s == cross_status for s in primary_status)
-            
+            async with self._acquire_browser() as (browser, cross_executor):
+                await browser.navigate(url)
+                await browser.wait_until_ready(self._ready_selector(game_analysis))
+                
+                result = await cross_executor.execute_test(
+                    test_case=test,
+                    browser=browser,
+                    artifact_capture=artifact_capture,
+                    game_analysis=game_analysis,
+                    run_label="cross_validator"
+                )
+                
             return {
-                "status": cross_status,
-                "agrees_with_primary": agreement,
-                "primary_statuses": primary_status,
+                "status": result.get("status"),
                 "agent_id": "cross_validator"
             }
             
@@ -233,55 +403,58 @@ class OrchestratorAgent(BaseAgent):
                 "error": str(e)
             }
             
-        finally:
-            await browser.stop()
+    def _status_counts(self, runs: List[Dict]) -> Counter:
+        """
+        Count run statuses in a single pass.
+        
+        Args:
+            runs: Results from repeat runs
             
+        Returns:
+            Counter of status values (None for runs without a status)
+        """
+        return Counter(r.get("status") for r in runs)
+        
     def _determine_verdict(
         self,
-        runs: List[Dict],
+        status_counts: Counter,
         cross_validation: Dict
     ) -> Dict:
         """
         Determine final test verdict based on all runs.
         
+        Also records on cross_validation whether it agreed with every
+        primary run.
+        
         Args:
-            runs: Results from repeat runs
+            status_counts: Run status counts from _status_counts
             cross_validation: Cross-validation result
             
         Returns:
             Final verdict dictionary
         """
-        statuses = [r.get("status") for r in runs if r.get("status")]
+        # Agreement: every primary run ended with the cross-validator's status
+        cross_validation["agrees_with_primary"] = (
+            "error" not in cross_validation
+            and status_counts[cross_validation.get("status")] == sum(status_counts.values())
+        )
+        
+        total = sum(count for status, count in status_counts.items() if status)
         
-        if not statuses:
+        if not total:
             return {
                 "result": "INCONCLUSIVE",
                 "confidence": 0,
                 "reason": "No valid runs completed"
             }
             
-        passed = statuses.count("passed")
-        failed = statuses.count("failed")
-        total = len(statuses)
+        passed = status_counts["passed"]
+        failed = status_counts["failed"]
         
         # Determine result
-        if passed == total:
-            result = "PASS"
-            confidence = 100
-            reason = f"All {total} runs passed"
-        elif failed == total:
-            result = "FAIL"
-            confidence = 100
-            reason = f"All {total} runs failed"
-        elif passed > failed:
-            result = "FLAKY"
-            confidence = int((passed / total) * 100)
-            reason = f"Inconsistent: {passed}/{total} passed"
-        else:
-            result = "FAIL"
-            confidence = int((failed / total) * 100)
-            reason = f"Majority failed: {failed}/{total}"
-            
+        key = (passed, failed, total)
+        result, confidence, reason = _VERDICT_TABLE.get(key) or _base_verdict(*key)
+        
         # Adjust based on cross-validation
         if cross_validation.get("agrees_with_primary"):
             confidence = min(100, confidence + 10)
@@ -300,56 +473,67 @@ class OrchestratorAgent(BaseAgent):
             "total_runs": total
         }
         
-    def _calculate_reproducibility(self, runs: List[Dict]) -> float:
+    def _calculate_reproducibility(self, status_counts: Counter) -> float:
         """
         Calculate reproducibility score.
         
         Args:
-            runs: List of test runs
+            status_counts: Run status counts from _status_counts
             
         Returns:
             Reproducibility percentage (0-100)
         """
-        if not runs:
-            return 0.0
-            
-        statuses = [r.get("status") for r in runs]
-        if not statuses:
+        total = sum(status_counts.values())
+        if not total:
             return 0.0
             
-        # Count most common status
-        from collections import Counter
-        counts = Counter(statuses)
-        most_common_count = counts.most_common(1)[0][1]
+        # Share of the most common status
+        most_common_count = max(status_counts.values())
         
-        return round((most_common_count / len(statuses)) * 100, 2)
+        return round((most_common_count / total) * 100, 2)
         
-    def _record_for_learning(
+    def _learning_record(
         self,
         url: str,
         test: Dict,
         results: Dict
-    ):
+    ) -> Optional[Dict]:
         """
-        Record test results for progressive learning.
+        Build a knowledge-base record for a test worth learning from.
         
         Args:
             url: Game URL
             test: Test case
             results: Execution results
+            
+        Returns:
+            add_test_results_batch record, or None if the test is not kept
         """
-        try:
-            verdict = results.get("verdict", {}).get("result", "UNKNOWN")
-            reproducibility = results.get("reproducibility", 0)
+        verdict = results.get("verdict", {}).get("result", "UNKNOWN")
+        reproducibility = results.get("reproducibility", 0)
+        
+        # Only record successful patterns for learning
+        if verdict == "PASS" and reproducibility >= 80:
+            return {
+                "game_url": url,
+                "test_case": test,
+                "result": verdict,
+                "execution_time": 0,  # Could calculate from results
+                "artifacts": None
+            }
+        return None
+        
+    def _record_for_learning(self, records: List[Dict]):
+        """
+        Record test results for progressive learning.
+        
+        Args:
+            records: Records built by _learning_record
+        """
+        if not records:
+            return
             
-            # Only record successful patterns for learning
-            if verdict == "PASS" and reproducibility >= 80:
-                self.knowledge_base.add_test_result(
-                    game_url=url,
-                    test_case=test,
-                    result=verdict,
-                    execution_time=0,  # Could calculate from results
-                    artifacts=None
-                )
+        try:
+            self.knowledge_base.add_test_results_batch(records)
         except Exception as e:
             self.log_error(f"Failed to record for learning: {e}")
@@ -1,8 +1,10 @@
 """
 Ranker Agent - Ranks test cases and selects top N
 """
-import json
-from typing import Dict, List, Any
+import heapq
+import re
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
 
 try:
@@ -13,15 +15,170 @@ except ImportError:
     LANGCHAIN_AVAILABLE = False
 
 from .base_agent import BaseAgent
+from ..rag.persistent_cache import game_fingerprint, get_result_cache
+from ..utils.cache import TTLCache
+from ..utils import jsonlib
 from ..config import settings
 
 
+# Parsed LLM rankings keyed by the exact prompt variables; rankings only
+# reference tests by id, so they are merged with the current tests each time
+_ranking_cache = TTLCache(maxsize=1000, ttl=3600)
+
+
+_IMPORTANT_KEYWORD_RE = re.compile(r"start|restart|score|load|main|core")
+
+_SCORED_CATEGORIES = frozenset({"functional", "ui", "edge_case", "performance"})
+_SCORED_PRIORITIES = frozenset({"high", "medium"})
+
+
+def _heuristic_key(test: Dict) -> Tuple[str, str, bool]:
+    """
+    Reduce a test to the only inputs heuristic scoring depends on.
+    
+    Categories and priorities that score like the default collapse to ""
+    so the score cache stays small.
+    """
+    category = (test.get("category") or "").lower()
+    priority = (test.get("priority") or "").lower()
+    name = (test.get("name") or "").lower()
+    return (
+        category if category in _SCORED_CATEGORIES else "",
+        priority if priority in _SCORED_PRIORITIES else "",
+        _IMPORTANT_KEYWORD_RE.search(name) is not None
+    )
+
+
+@lru_cache(maxsize=None)
+def _heuristic_scores(category: str, priority: str, important: bool) -> Dict:
+    """
+    Heuristic scores for a (category, priority, keyword) combination.
+    
+    Returns a shared dict; callers must copy it before modifying.
+    """
+    scores = {
+        "impact": 5,
+        "coverage": 5,
+        "risk": 5,
+        "complexity": 3,
+        "reason": ""
+    }
+    
+    # Priority-based impact
+    if priority == "high":
+        scores["impact"] = 9
+    elif priority == "medium":
+        scores["impact"] = 6
+    else:
+        scores["impact"] = 4
+        
+    # Category-based scoring
+    if category == "functional":
+        scores["impact"] += 1
+        scores["risk"] = 7
+        scores["reason"] = "Core functionality test"
+    elif category == "ui":
+        scores["coverage"] = 7
+        scores["reason"] = "UI coverage test"
+    elif category == "edge_case":
+        scores["risk"] = 8
+        scores["complexity"] = 6
+        scores["reason"] = "Edge case for robustness"
+    elif category == "performance":
+        scores["impact"] = 6
+        scores["risk"] = 5
+        scores["reason"] = "Performance verification"
+    else:
+        scores["reason"] = "General test case"
+        
+    # Name-based adjustments
+    if important:
+        scores["impact"] = min(10, scores["impact"] + 2)
+        scores["reason"] += " (contains important keyword)"
+        
+    # Ensure scores are in range
+    for key in ["impact", "coverage", "risk", "complexity"]:
+        scores[key] = max(0, min(10, scores[key]))
+        
+    # Calculate total
+    scores["total"] = round(
+        (scores["impact"] * 3 + scores["coverage"] * 2 + 
+         scores["risk"] * 2 - scores["complexity"]) / 8,
+        2
+    )
+    
+    return scores
+
+
+def _ranking_overlay(ranked: Dict, original: Dict) -> Dict:
+    """Fields a ranked test adds to or changes from its original test."""
+    return {
+        key: value for key, value in ranked.items()
+        if key not in original or original[key] != value
+    }
+
+
+@lru_cache(maxsize=None)
+def _get_llm(model_name: str) -> Optional["Ollama"]:
+    """
+    Shared Ollama LLM for every ranker instance; None without LangChain.
+    
+    Agents are created per request, so one client per model avoids setting
+    up a new client object for each run.
+    """
+    if not LANGCHAIN_AVAILABLE:
+        return None
+    return Ollama(
+        model=model_name,
+        base_url=settings.OLLAMA_HOST,
+        temperature=0.3  # Lower temperature for more consistent ranking
+    )
+
+
 class RankerAgent(BaseAgent):
     """
     Ranks test cases by importance and selects the top N for execution.
     Uses criteria like impact, coverage, complexity, and risk.
     """
     
+    if LANGCHAIN_AVAILABLE:
+        # Built once per process. Static instructions first and per-run
+        # details last, so the shared prompt prefix can be reused from the
+        # model's cache
+        _PROMPT = ChatPromptTemplate.from_messages([
+            ("system", """You are an expert test prioritization system. Rank test cases by these criteria:
+- Impact (0-10): How critical is this test for game functionality?
+- Coverage (0-10): How much of the game does this test cover?
+- Risk (0-10): How likely is this area to have bugs?
+- Complexity (0-10): How complex is the test? (higher = harder to execute)
+
+Calculate overall score: (Impact * 3 + Coverage * 2 + Risk * 2 - Complexity) / 8
+
+Output ONLY valid JSON array with ranked tests. No explanation."""),
+            ("system", """Rank all tests and output JSON array with scores:
+[
+  {{
+    "id": original_id,
+    "name": "test name",
+    "impact": 0-10,
+    "coverage": 0-10,
+    "risk": 0-10,
+    "complexity": 0-10,
+    "overall_score": calculated_score,
+    "ranking_reason": "brief reason"
+  }}
+]
+
+Sort by overall_score descending."""),
+            ("human", """Game Type: {game_type}
+Key Mechanics: {mechanics}
+
+Test Cases to Rank (i=id, n=name, c=category, p=priority, d=description):
+{test_cases}""")
+        ])
+    else:
+        _PROMPT = None
+    
     def __init__(self):
         super().__init__(
             name="Ranker",
@@ -29,13 +186,9 @@ class RankerAgent(BaseAgent):
         )
         self.model_name = settings.OLLAMA_TEXT_MODEL
         
-        if LANGCHAIN_AVAILABLE:
-            self.llm = Ollama(
-                model=self.model_name,
-                temperature=0.3  # Lower temperature for more consistent ranking
-            )
-        else:
-            self.llm = None
+        self.llm = _get_llm(self.model_name)
+        
+        self._chain = self._PROMPT | self.llm if self.llm else None
             
     async def execute(self, context: Dict[str, Any]) -> Dict[str, Any]:
         """Execute test ranking."""
@@ -65,95 +218,114 @@ class RankerAgent(BaseAgent):
         """
         self.log_info(f"Ranking {len(test_cases)} tests, selecting top {top_n}")
         
+        by_id = {t.get("id"): t for t in reversed(test_cases)}
+        
+        # Rankings persisted by earlier runs over the same tests are reused
+        result_cache = get_result_cache()
+        cache_key = game_fingerprint(
+            game_analysis,
+            game_analysis.get("url", ""),
+            top_n,
+            self.model_name if self.llm else None,
+            [(t.get("id"), t.get("name"), t.get("category"), t.get("priority")) for t in test_cases]
+        )
+        overlays = result_cache.get("ranker", cache_key) if result_cache else None
+        if overlays is not None:
+            self.log_info("Using persisted ranking")
+            return [
+                {**by_id[test_id], **overlay}
+                for test_id, overlay in overlays
+                if test_id in by_id
+            ]
+            
+        degraded = False
+        ranked = None
         if self.llm:
-            ranked = await self._rank_with_langchain(test_cases, game_analysis, top_n)
-        else:
+            # Only the strongest heuristic candidates go to the LLM to re-rank
+            candidates = self._rank_with_heuristics(
+                test_cases, game_analysis, min(len(test_cases), 2 * top_n)
+            )
+            ranked = await self._rank_with_langchain(candidates, game_analysis, top_n)
+            degraded = ranked is None
+            
+        if ranked is None:
             ranked = self._rank_with_heuristics(test_cases, game_analysis, top_n)
             
+        ranked = ranked[:top_n]
+        # A heuristic ranking standing in for a failed LLM call is not
+        # persisted, so the next run retries the model
+        if result_cache and not degraded:
+            # Persist only what ranking added, so per-run fields such as
+            # generated_at come from the current tests on a hit
+            result_cache.set("ranker", cache_key, [
+                [test.get("id"), _ranking_overlay(test, by_id.get(test.get("id"), {}))]
+                for test in ranked
+            ])
+            
         self.log_info(f"Selected {len(ranked)} top tests")
-        return ranked[:top_n]
+        return ranked
         
     async def _rank_with_langchain(
         self,
         test_cases: List[Dict],
         game_analysis: Dict,
         top_n: int
-    ) -> List[Dict]:
+    ) -> Optional[List[Dict]]:
         """
         Rank tests using LangChain and Ollama.
-        """
-        prompt_template = ChatPromptTemplate.from_messages([
-            ("system", """You are an expert test prioritization system. Rank test cases by these criteria:
-- Impact (0-10): How critical is this test for game functionality?
-- Coverage (0-10): How much of the game does this test cover?
-- Risk (0-10): How likely is this area to have bugs?
-- Complexity (0-10): How complex is the test? (higher = harder to execute)
-
-Calculate overall score: (Impact * 3 + Coverage * 2 + Risk * 2 - Complexity) / 8
-
-Output ONLY valid JSON array with ranked tests. No explanation."""),
-            ("human", """Game Type: {game_type}
-Key Mechanics: {mechanics}
-
-Test Cases to Rank:
-{test_cases}
-
-Rank all tests and output JSON array with scores:
-[
-  {{
-    "id": original_id,
-    "name": "test name",
-    "impact": 0-10,
-    "coverage": 0-10,
-    "risk": 0-10,
-    "complexity": 0-10,
-    "overall_score": calculated_score,
-    "ranking_reason": "brief reason"
-  }}
-]
-
-Sort by overall_score descending.""")
-        ])
         
+        Returns:
+            Ranked tests, or None if the LLM gave no usable ranking
+        """
         try:
-            chain = prompt_template | self.llm
+            chain = self._chain
             
-            # Prepare test cases summary
-            test_summary = json.dumps([
+            # Prepare a compact test summary; short keys and no indentation
+            # keep the prompt small (legend is in the human message)
+            test_summary = jsonlib.dumps([
                 {
-                    "id": t.get("id"),
-                    "name": t.get("name"),
-                    "category": t.get("category"),
-                    "priority": t.get("priority"),
-                    "description": t.get("description", "")[:100]
+                    "i": t.get("id"),
+                    "n": t.get("name"),
+                    "c": t.get("category"),
+                    "p": t.get("priority"),
+                    "d": (t.get("description") or "")[:60]
                 }
-                for t in test_cases[:30]  # Limit to avoid token limits
-            ], indent=2)
+                for t in test_cases
+            ])
             
-            response = await chain.ainvoke({
+            variables = {
                 "game_type": game_analysis.get("game_type", "puzzle"),
-                "mechanics": json.dumps(game_analysis.get("mechanics", [])),
+                "mechanics": jsonlib.dumps(game_analysis.get("mechanics", [])),
                 "test_cases": test_summary
-            })
-            
-            content = response.content
+            }
             
-            # Extract JSON from response
-            start = content.find("[")
-            end = content.rfind("]") + 1
+            cache_key = tuple(sorted(variables.items()))
+            ranked_data = _ranking_cache.get(cache_key)
             
-            if start >= 0 and end > start:
-                ranked_data = json.loads(content[start:end])
+            if ranked_data is None:
+                response = await chain.ainvoke(variables)
+                
+                # Completion models return a plain string
+                content = getattr(response, "content", response)
+                
+                # Extract JSON from response
+                ranked_data = jsonlib.extract(content, list)
+                if ranked_data is not None:
+                    _ranking_cache.set(cache_key, ranked_data)
+            else:
+                self.log_info("Using cached ranking")
                 
-                # Merge ranking data with original test cases
+            if isinstance(ranked_data, list):
+                # Merge ranking data with original test cases; built in
+                # reverse so the first test with a given id wins
+                by_id = {t.get("id"): t for t in reversed(test_cases)}
                 ranked_tests = []
                 for rank_item in ranked_data:
-                    original = next(
-                        (t for t in test_cases if t.get("id") == rank_item.get("id")),
-                        None
-                    )
+                    original = by_id.get(rank_item.get("id"))
                     if original:
-                        merged = {**original, **rank_item}
+                        # Copy first; the input tests must stay unmodified
+                        merged = original.copy()
+                        merged.update(rank_item)
                         ranked_tests.append(merged)
                         
                 # Sort by overall score
@@ -168,7 +340,7 @@ Sort by overall_score descending.""")
         except Exception as e:
             self.log_error(f"LangChain ranking failed: {e}")
             
-        return self._rank_with_heuristics(test_cases, game_analysis, top_n)
+        return None
         
     def _rank_with_heuristics(
         self,
@@ -179,88 +351,27 @@ Sort by overall_score descending.""")
         """
         Rank tests using heuristic scoring.
         """
-        scored_tests = []
+        scores = [
+            _heuristic_scores(*_heuristic_key(test))
+            for test in test_cases
+        ]
         
-        for test in test_cases:
-            score = self._calculate_heuristic_score(test, game_analysis)
-            scored_test = {
-                **test,
-                "overall_score": score["total"],
-                "impact": score["impact"],
-                "coverage": score["coverage"],
-                "risk": score["risk"],
-                "complexity": score["complexity"],
-                "ranking_reason": score["reason"]
-            }
-            scored_tests.append(scored_test)
-            
-        # Sort by score descending
-        scored_tests.sort(key=lambda x: x["overall_score"], reverse=True)
-        
-        return scored_tests[:top_n]
-        
-    def _calculate_heuristic_score(
-        self,
-        test: Dict,
-        game_analysis: Dict
-    ) -> Dict:
-        """
-        Calculate heuristic score for a test case.
-        """
-        scores = {
-            "impact": 5,
-            "coverage": 5,
-            "risk": 5,
-            "complexity": 3,
-            "reason": ""
-        }
+        # Totals as their own column so selection is a plain list lookup
+        totals = [score["total"] for score in scores]
         
-        category = test.get("category", "").lower()
-        priority = test.get("priority", "").lower()
-        name = test.get("name", "").lower()
+        # Top N by score descending; ties keep input order like a stable sort
+        top = heapq.nlargest(top_n, range(len(totals)), key=totals.__getitem__)
         
-        # Priority-based impact
-        if priority == "high":
-            scores["impact"] = 9
-        elif priority == "medium":
-            scores["impact"] = 6
-        else:
-            scores["impact"] = 4
-            
-        # Category-based scoring
-        if category == "functional":
-            scores["impact"] += 1
-            scores["risk"] = 7
-            scores["reason"] = "Core functionality test"
-        elif category == "ui":
-            scores["coverage"] = 7
-            scores["reason"] = "UI coverage test"
-        elif category == "edge_case":
-            scores["risk"] = 8
-            scores["complexity"] = 6
-            scores["reason"] = "Edge case for robustness"
-        elif category == "performance":
-            scores["impact"] = 6
-            scores["risk"] = 5
-            scores["reason"] = "Performance verification"
-        else:
-            scores["reason"] = "General test case"
-            
-        # Name-based adjustments
-        important_keywords = ["start", "restart", "score", "load", "main", "core"]
-        if any(kw in name for kw in important_keywords):
-            scores["impact"] = min(10, scores["impact"] + 2)
-            scores["reason"] += " (contains important keyword)"
-            
-        # Ensure scores are in range
-        for key in ["impact", "coverage", "risk", "complexity"]:
-            scores[key] = max(0, min(10, scores[key]))
-            
-        # Calculate total
-        scores["total"] = round(
-            (scores["impact"] * 3 + scores["coverage"] * 2 + 
-             scores["risk"] * 2 - scores["complexity"]) / 8,
-            2
-        )
-        
-        return scores
+        # Only the selected tests get merged score fields
+        return [
+            {
+                **test_cases[i],
+                "overall_score": scores[i]["total"],
+                "impact": scores[i]["impact"],
+                "coverage": scores[i]["coverage"],
+                "risk": scores[i]["risk"],
+                "complexity": scores[i]["complexity"],
+                "ranking_reason": scores[i]["reason"]
+            }
+            for i in top
+        ]
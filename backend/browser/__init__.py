@@ -1,5 +1,6 @@
 """Browser package"""
 from .controller import BrowserController
 from .artifact_capture import ArtifactCapture
+from .browser_pool import BrowserPool
 
-__all__ = ["BrowserController", "ArtifactCapture"]
+__all__ = ["BrowserController", "ArtifactCapture", "BrowserPool"]
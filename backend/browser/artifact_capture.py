@@ -1,20 +1,72 @@
 """
 Artifact Capture - Captures screenshots, DOM, logs, and network data
 """
-import json
+import asyncio
+import itertools
+import mmap
+import os
+import time
 from pathlib import Path
-from datetime import datetime
 from typing import Dict, List, Any, Optional
 
 from ..config import settings
+from ..utils import jsonlib
 from .controller import BrowserController
 
 
+_capture_sequence = itertools.count()
+
+_WRITE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
+
+# Artifacts at least this large bypass the page cache where O_DIRECT exists;
+# they are written once and rarely read back soon
+_DIRECT_WRITE_MIN = 1 << 20
+_DIRECT_ALIGN = 4096
+
+
+def _write_fd(fd: int, data):
+    """Write all of data to an open file descriptor."""
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+
+def _write_direct(path: Path, data: bytes) -> bool:
+    """
+    Write a file with O_DIRECT, bypassing the kernel page cache.
+    
+    O_DIRECT needs block-aligned buffers and lengths, so data is copied into
+    a page-aligned anonymous mapping padded to the block size and the file
+    is truncated back to its real length afterwards.
+    
+    Returns:
+        False when O_DIRECT is unavailable or refused (e.g. on tmpfs); the
+        caller then writes normally
+    """
+    if not hasattr(os, "O_DIRECT"):
+        return False
+    try:
+        fd = os.open(path, _WRITE_FLAGS | os.O_DIRECT, 0o644)
+    except OSError:
+        return False
+    try:
+        padded = -(-len(data) // _DIRECT_ALIGN) * _DIRECT_ALIGN
+        with mmap.mmap(-1, padded) as buffer:
+            buffer[:len(data)] = data
+            _write_fd(fd, buffer)
+        os.ftruncate(fd, len(data))
+        return True
+    except OSError:
+        return False
+    finally:
+        os.close(fd)
+
+
 class ArtifactCapture:
     """
     Captures and stores test artifacts including:
-    - Screenshots (PNG)
-    - DOM snapshots (HTML)
+    - Screenshots (JPEG)
+    - DOM snapshots (gzip-compressed HTML)
     - Console logs (JSON)
     - Network logs (JSON)
     """
@@ -30,6 +82,7 @@ class ArtifactCapture:
         self.artifacts_dir = settings.ARTIFACTS_DIR / session_id
         self.artifacts_dir.mkdir(parents=True, exist_ok=True)
         self.artifact_index: List[Dict] = []
+        self._index_file = None
         
     async def capture_all(
         self,
@@ -48,119 +101,50 @@ class ArtifactCapture:
         Returns:
             Dictionary with paths to all captured artifacts
         """
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        prefix = f"step_{step_index:03d}_{step_name}_{timestamp}"
+        # The same step can be captured again in a session (re-executed
+        # tests, cross-validation), so names carry the capture time plus a
+        # process-wide sequence number in case the clock is coarse
+        ts_ns = time.time_ns()
+        prefix = f"step_{step_index:03d}_{step_name}_{ts_ns:x}_{next(_capture_sequence)}"
         
         artifacts = {}
         
-        # Capture screenshot
-        screenshot_path = await self.capture_screenshot(browser, prefix)
-        artifacts["screenshot"] = screenshot_path
-        
-        # Capture DOM
-        dom_path = await self.capture_dom(browser, prefix)
-        artifacts["dom"] = dom_path
-        
-        # Capture console logs
-        console_path = self.capture_console_logs(browser, prefix)
-        artifacts["console_logs"] = console_path
+        # Screenshot and DOM are independent browser round-trips
+        screenshot, dom = await asyncio.gather(
+            browser.screenshot_bytes(quality=settings.SCREENSHOT_QUALITY),
+            browser.get_dom_gzip()
+        )
         
-        # Capture network logs
-        network_path = self.capture_network_logs(browser, prefix)
-        artifacts["network_logs"] = network_path
+        # Snapshot the logs now; encoding and writing happen off the event loop
+        artifacts["screenshot"] = f"{prefix}_screenshot.jpg"
+        artifacts["dom"] = f"{prefix}_dom.html.gz"
+        artifacts["console_logs"] = f"{prefix}_console.json"
+        artifacts["network_logs"] = f"{prefix}_network.json"
+        console_logs = browser.get_console_logs()
+        network_logs = browser.get_network_logs()
+        
+        def write_step():
+            self._flush_step({
+                artifacts["screenshot"]: screenshot,
+                artifacts["dom"]: dom,
+                artifacts["console_logs"]: jsonlib.dump_bytes(console_logs, indent=True),
+                artifacts["network_logs"]: jsonlib.dump_bytes(network_logs, indent=True)
+            })
+            
+        await asyncio.to_thread(write_step)
         
-        # Update artifact index
-        self.artifact_index.append({
+        # Update artifact index; only the new record is written
+        record = {
             "step_index": step_index,
             "step_name": step_name,
-            "timestamp": timestamp,
+            "ts_ns": ts_ns,
             "artifacts": artifacts
-        })
-        
-        # Save index
-        self._save_index()
+        }
+        self.artifact_index.append(record)
+        self._append_index(record)
         
         return artifacts
         
-    async def capture_screenshot(
-        self,
-        browser: BrowserController,
-        prefix: str,
-        full_page: bool = False
-    ) -> str:
-        """
-        Capture a screenshot.
-        
-        Args:
-            browser: Browser controller instance
-            prefix: File prefix
-            full_page: Whether to capture full page
-            
-        Returns:
-            Path to saved screenshot
-        """
-        filename = f"{prefix}_screenshot.png"
-        path = str(self.artifacts_dir / filename)
-        await browser.screenshot(path, full_page=full_page)
-        return filename
-        
-    async def capture_dom(self, browser: BrowserController, prefix: str) -> str:
-        """
-        Capture DOM snapshot.
-        
-        Args:
-            browser: Browser controller instance
-            prefix: File prefix
-            
-        Returns:
-            Path to saved DOM file
-        """
-        filename = f"{prefix}_dom.html"
-        path = self.artifacts_dir / filename
-        
-        dom = await browser.get_dom()
-        path.write_text(dom, encoding='utf-8')
-        
-        return filename
-        
-    def capture_console_logs(self, browser: BrowserController, prefix: str) -> str:
-        """
-        Capture console logs.
-        
-        Args:
-            browser: Browser controller instance
-            prefix: File prefix
-            
-        Returns:
-            Path to saved logs file
-        """
-        filename = f"{prefix}_console.json"
-        path = self.artifacts_dir / filename
-        
-        logs = browser.get_console_logs()
-        path.write_text(json.dumps(logs, indent=2), encoding='utf-8')
-        
-        return filename
-        
-    def capture_network_logs(self, browser: BrowserController, prefix: str) -> str:
-        """
-        Capture network logs.
-        
-        Args:
-            browser: Browser controller instance
-            prefix: File prefix
-            
-        Returns:
-            Path to saved logs file
-        """
-        filename = f"{prefix}_network.json"
-        path = self.artifacts_dir / filename
-        
-        logs = browser.get_network_logs()
-        path.write_text(json.dumps(logs, indent=2), encoding='utf-8')
-        
-        return filename
-        
     def save_custom_artifact(
         self,
         name: str,
@@ -182,19 +166,58 @@ class ArtifactCapture:
         path = self.artifacts_dir / filename
         
         if file_type == "json":
-            path.write_text(json.dumps(data, indent=2, default=str), encoding='utf-8')
+            path.write_bytes(jsonlib.dump_bytes(data, indent=True, default=str))
         else:
             path.write_text(str(data), encoding='utf-8')
             
         return filename
         
+    def _flush_step(self, files: Dict[str, bytes]):
+        """
+        Write a step's files in one pass straight from bytes.
+        
+        Args:
+            files: File contents keyed by file name in the session directory
+        """
+        for filename, data in files.items():
+            path = self.artifacts_dir / filename
+            if len(data) >= _DIRECT_WRITE_MIN and _write_direct(path, data):
+                continue
+            fd = os.open(path, _WRITE_FLAGS, 0o644)
+            try:
+                _write_fd(fd, data)
+            finally:
+                os.close(fd)
+                
+    def _append_index(self, record: Dict):
+        """Append one record to index.jsonl, keeping the file open between steps."""
+        if self._index_file is None:
+            self._index_file = open(self.artifacts_dir / "index.jsonl", "ab")
+        self._index_file.write(jsonlib.dump_bytes(record) + b"\n")
+        
+    def _load_index(self) -> List[Dict]:
+        """Read the records appended to index.jsonl so far."""
+        index_path = self.artifacts_dir / "index.jsonl"
+        if not index_path.exists():
+            return []
+        with open(index_path, "rb") as f:
+            return [jsonlib.loads(line) for line in f if line.strip()]
+            
+    def flush(self):
+        """
+        Close index.jsonl and write the complete index.json.
+        
+        Call once the session ends; later captures reopen the JSONL file.
+        """
+        if self._index_file is not None:
+            self._index_file.close()
+            self._index_file = None
+        self._save_index()
+        
     def _save_index(self):
         """Save the artifact index."""
         index_path = self.artifacts_dir / "index.json"
-        index_path.write_text(
-            json.dumps(self.artifact_index, indent=2),
-            encoding='utf-8'
-        )
+        index_path.write_bytes(jsonlib.dump_bytes(self.artifact_index, indent=True))
         
     def get_artifacts_summary(self) -> Dict:
         """
@@ -203,6 +226,10 @@ class ArtifactCapture:
         Returns:
             Dictionary with artifact summary
         """
+        if not self.artifact_index:
+            # Captured by another instance for this session
+            self.artifact_index = self._load_index()
+            
         return {
             "session_id": self.session_id,
             "artifacts_dir": str(self.artifacts_dir),
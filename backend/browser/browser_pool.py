@@ -0,0 +1,85 @@
+"""
+Browser Pool - Keeps one Chromium running for the app and hands out contexts
+"""
+import asyncio
+from typing import Optional
+
+from playwright.async_api import async_playwright, Browser, BrowserContext
+
+from ..config import settings
+from .controller import CONTEXT_OPTIONS, BrowserController, launch_options
+
+
+class BrowserPool:
+    """
+    Warm browser shared across API requests.
+    
+    Launching Chromium costs hundreds of milliseconds; a new context on a
+    running browser costs a few. Each acquire() returns an isolated context.
+    """
+    
+    def __init__(self, headless: Optional[bool] = None):
+        """
+        Initialize the pool without launching anything.
+        
+        Args:
+            headless: Run in headless mode. Defaults to settings.BROWSER_HEADLESS
+        """
+        self.headless = settings.BROWSER_HEADLESS if headless is None else headless
+        self.playwright = None
+        self.browser: Optional[Browser] = None
+        self._lock = asyncio.Lock()
+        
+    async def start(self):
+        """Launch the shared browser if it is not already running."""
+        async with self._lock:
+            if self.browser is not None and self.browser.is_connected():
+                return
+            if self.playwright is None:
+                self.playwright = await async_playwright().start()
+            self.browser = await self.playwright.chromium.launch(
+                **launch_options(self.headless)
+            )
+            
+    async def acquire(self) -> BrowserContext:
+        """
+        Get a fresh, isolated context on the shared browser.
+        
+        Returns:
+            New browser context; pass it to release() when done
+        """
+        await self.start()
+        return await self.browser.new_context(**CONTEXT_OPTIONS)
+        
+    async def release(
+        self,
+        context: BrowserContext,
+        controller: Optional[BrowserController] = None
+    ):
+        """
+        Close a context obtained from acquire().
+        
+        Args:
+            context: Context to close
+            controller: Controller opened on the context, if any. It is
+                stopped first so a trace recorded with ENABLE_TRACE is saved
+        """
+        if controller is not None:
+            try:
+                await controller.stop()
+            except Exception:
+                pass
+        try:
+            await context.close()
+        except Exception:
+            pass
+            
+    async def stop(self):
+        """Close the shared browser and Playwright."""
+        async with self._lock:
+            if self.browser:
+                await self.browser.close()
+                self.browser = None
+            if self.playwright:
+                await self.playwright.stop()
+                self.playwright = None
@@ -2,16 +2,142 @@
 Browser Controller - Playwright-based browser automation
 """
 import asyncio
+import base64
+import gzip
+import time
+from collections import deque
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Deque, Tuple
 from datetime import datetime
 import json
 
 from playwright.async_api import async_playwright, Browser, Page, BrowserContext
+# Base of every Playwright failure, including TimeoutError
+from playwright.async_api import Error as PlaywrightError
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
 
 from ..config import settings
 
 
+# Shared with BrowserPool so pooled and standalone browsers behave alike
+LAUNCH_ARGS = [
+    '--disable-web-security',
+    # Translate and back/forward cache are never used by test runs
+    '--disable-features=IsolateOrigins,site-per-process,Translate,BackForwardCache',
+    # /dev/shm is often tiny in containers; use /tmp for shared memory
+    '--disable-dev-shm-usage',
+    # Skip background services a test browser has no use for
+    '--disable-background-networking',
+    '--disable-extensions',
+    '--disable-default-apps',
+    '--disable-sync',
+    '--no-first-run',
+    '--mute-audio'
+]
+# Headless renders in software anyway; headed runs keep GPU acceleration
+HEADLESS_ARGS = ['--disable-gpu']
+LAUNCH_OPTIONS = {
+    # Playwright's default, stated explicitly: it then passes --no-sandbox.
+    # Only browse trusted game URLs with it
+    'chromium_sandbox': False,
+    # Let the server own Ctrl-C and shut the browser down itself
+    'handle_sigint': False
+}
+# No record_video_dir: video stays off. Set ENABLE_TRACE for debug traces
+CONTEXT_OPTIONS = {
+    'viewport': {'width': 1280, 'height': 720}
+}
+
+_CDP_REQUEST = "Network.requestWillBeSent"
+_CDP_RESPONSE = "Network.responseReceived"
+
+
+# Page-side helper behind snapshot_page. Installed once per page as an init
+# script so each snapshot only sends a short call expression over CDP
+_SNAPSHOT_JS = """window.__snapshotPage = () => {
+    let score = null;
+    for (const sel of ['[class*="score"]', '[id*="score"]', '.score', '#score']) {
+        const el = document.querySelector(sel);
+        if (el && el.textContent) {
+            score = el.textContent.trim();
+            break;
+        }
+    }
+
+    const texts = [];
+    document.querySelectorAll('button, [role="button"], .btn, a').forEach(el => {
+        const text = el.textContent?.trim();
+        if (text && text.length < 50) {
+            texts.push(text);
+        }
+    });
+
+    const elements = [];
+    const interactable = document.querySelectorAll(
+        'button, a, input, [onclick], [role="button"], [tabindex], canvas, .clickable, [class*="tile"], [class*="cell"], [class*="card"]'
+    );
+
+    interactable.forEach((el, i) => {
+        const rect = el.getBoundingClientRect();
+        if (rect.width > 0 && rect.height > 0) {
+            elements.push({
+                index: i,
+                tag: el.tagName.toLowerCase(),
+                id: el.id || null,
+                class: el.className || null,
+                text: el.textContent?.trim().slice(0, 100) || null,
+                x: rect.x + rect.width / 2,
+                y: rect.y + rect.height / 2,
+                width: rect.width,
+                height: rect.height
+            });
+        }
+    });
+
+    return {
+        score: score,
+        visible_text: texts.slice(0, 20),
+        interactive_elements: elements.slice(0, 100)
+    };
+};"""
+_SNAPSHOT_CALL = "typeof window.__snapshotPage === 'function' ? window.__snapshotPage() : null"
+
+
+def launch_options(headless: bool) -> Dict[str, Any]:
+    """Keyword arguments for chromium.launch() in the given mode."""
+    return {
+        **LAUNCH_OPTIONS,
+        'headless': headless,
+        'args': LAUNCH_ARGS + HEADLESS_ARGS if headless else LAUNCH_ARGS
+    }
+
+
+def _iso_from_ns(ts_ns: int) -> str:
+    """Format a time.time_ns() stamp as a local ISO timestamp."""
+    return datetime.fromtimestamp(ts_ns / 1e9).isoformat()
+
+
+def _compress_trace(path: Path):
+    """Recompress a Playwright trace zip as .zip.zst; runs in a worker thread."""
+    if not ZSTD_AVAILABLE:
+        return
+    compressor = zstandard.ZstdCompressor(level=3)
+    with open(path, "rb") as src, open(f"{path}.zst", "wb") as dst:
+        compressor.copy_stream(src, dst)
+    path.unlink()
+
+
+def _write_file(path: Path, data: bytes):
+    """Write bytes to path, creating parent directories."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+
+
 class BrowserController:
     """
     Playwright-based browser controller for game testing.
@@ -23,8 +149,19 @@ class BrowserController:
         self.browser: Optional[Browser] = None
         self.context: Optional[BrowserContext] = None
         self.page: Optional[Page] = None
-        self.console_logs: List[Dict] = []
-        self.network_logs: List[Dict] = []
+        # Bounded so long sessions keep only the most recent entries. Events
+        # are stored raw with time.time_ns() stamps and formatted on read
+        self.console_logs: Deque[Tuple] = deque(maxlen=settings.MAX_LOG_ENTRIES)
+        # (CDP event name, raw params), with responses stored as
+        # (clock offset, raw params); or ("request"/"response", fields)
+        # from page callbacks
+        self.network_logs: Deque[Tuple[str, Any]] = deque(
+            maxlen=settings.MAX_LOG_ENTRIES
+        )
+        # Wall-clock minus CDP monotonic time, learned from request events
+        self._cdp_clock_offset = 0.0
+        self._owns_browser = True
+        self._tracing = False
         
     async def start(self, headless: bool = None):
         """
@@ -37,30 +174,103 @@ class BrowserController:
             headless = settings.BROWSER_HEADLESS
             
         self.playwright = await async_playwright().start()
-        self.browser = await self.playwright.chromium.launch(
-            headless=headless,
-            args=['--disable-web-security', '--disable-features=IsolateOrigins,site-per-process']
-        )
-        self.context = await self.browser.new_context(
-            viewport={'width': 1280, 'height': 720},
-            record_video_dir=None  # Can enable for video recording
-        )
+        self.browser = await self.playwright.chromium.launch(**launch_options(headless))
+        await self._open_page()
+        
+    @classmethod
+    async def from_context(cls, context: BrowserContext) -> "BrowserController":
+        """
+        Create a controller on a context from an already running browser.
+        
+        The controller does not own the browser: stop() only closes the
+        context, and reset() opens new contexts on the same browser.
+        
+        Args:
+            context: Fresh browser context, e.g. from BrowserPool.acquire()
+            
+        Returns:
+            Controller with a page open on the context
+        """
+        controller = cls()
+        controller.browser = context.browser
+        controller._owns_browser = False
+        await controller._open_page(context)
+        return controller
+        
+    async def _open_page(self, context: Optional[BrowserContext] = None):
+        """
+        Open a page on the given context, or on a fresh one.
+        
+        Args:
+            context: Context to use; a new one is created on the running
+                browser when omitted
+        """
+        self.context = context or await self.browser.new_context(**CONTEXT_OPTIONS)
         self.page = await self.context.new_page()
         
+        # Traces are large; only record them when debugging
+        self._tracing = settings.ENABLE_TRACE
+        if self._tracing:
+            await self.context.tracing.start(screenshots=True, snapshots=True)
+            
+        # Install page helpers for every document the page loads
+        await self.page.add_init_script(_SNAPSHOT_JS)
+        
         # Set up console log capture
         self.page.on("console", self._handle_console)
         
         # Set up network log capture
-        self.page.on("request", self._handle_request)
-        self.page.on("response", self._handle_response)
+        await self._attach_network_capture()
         
         # Set timeout
         self.page.set_default_timeout(settings.BROWSER_TIMEOUT)
         
+    async def _attach_network_capture(self):
+        """
+        Record network traffic from raw CDP events.
+        
+        Events are buffered untouched and only formatted when the logs are
+        read. Falls back to per-request page callbacks when CDP is unavailable.
+        """
+        try:
+            cdp = await self.context.new_cdp_session(self.page)
+            await cdp.send("Network.enable")
+        except Exception:
+            self.page.on("request", self._handle_request)
+            self.page.on("response", self._handle_response)
+            return
+            
+        cdp.on(_CDP_REQUEST, self._handle_cdp_request)
+        cdp.on(_CDP_RESPONSE, self._handle_cdp_response)
+            
+    async def reset(self):
+        """
+        Reset to a clean page without relaunching the browser.
+        
+        Closes the current context (cookies, storage, page state) and opens a
+        new one, so a pooled browser can be reused between runs.
+        """
+        await self._close_context()
+        self.clear_logs()
+        await self._open_page()
+        
+    async def _close_context(self):
+        """Close the current context, saving its trace first if recording."""
+        if not self.context:
+            return
+        if self._tracing:
+            self._tracing = False
+            path = settings.ARTIFACTS_DIR / "traces" / f"trace_{time.time_ns()}.zip"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            await self.context.tracing.stop(path=path)
+            await asyncio.to_thread(_compress_trace, path)
+        await self.context.close()
+        
     async def stop(self):
-        """Stop the browser and clean up resources."""
-        if self.context:
-            await self.context.close()
+        """Close the context, and the browser too unless it is shared."""
+        await self._close_context()
+        if not self._owns_browser:
+            return
         if self.browser:
             await self.browser.close()
         if self.playwright:
@@ -76,21 +286,56 @@ class BrowserController:
         """
         await self.page.goto(url, wait_until=wait_until)
         
-    async def screenshot(self, path: str, full_page: bool = False) -> str:
+    async def screenshot(
+        self,
+        path: str,
+        full_page: bool = False,
+        quality: Optional[int] = None
+    ) -> str:
         """
         Take a screenshot.
         
+        The image format follows the file extension (.jpg/.jpeg for JPEG,
+        PNG otherwise); the file is written from a worker thread.
+        
         Args:
             path: Path to save the screenshot
             full_page: Capture full page or just viewport
+            quality: JPEG quality (0-100); ignored for PNG
             
         Returns:
             Path to the saved screenshot
         """
-        Path(path).parent.mkdir(parents=True, exist_ok=True)
-        await self.page.screenshot(path=path, full_page=full_page)
+        is_jpeg = Path(path).suffix.lower() in (".jpg", ".jpeg")
+        image = await self.page.screenshot(
+            type="jpeg" if is_jpeg else "png",
+            quality=quality if is_jpeg else None,
+            full_page=full_page
+        )
+        await asyncio.to_thread(_write_file, Path(path), image)
         return path
         
+    async def screenshot_bytes(
+        self,
+        full_page: bool = False,
+        quality: Optional[int] = None
+    ) -> bytes:
+        """
+        Take a screenshot without writing it to disk.
+        
+        Args:
+            full_page: Capture full page or just viewport
+            quality: JPEG quality (0-100); a PNG is taken when omitted
+            
+        Returns:
+            Image bytes
+        """
+        if quality is None:
+            return await self.page.screenshot(full_page=full_page)
+        return await self.page.screenshot(
+            type="jpeg", quality=quality, full_page=full_page
+        )
+        
     async def click(self, selector: str, timeout: int = None):
         """
         Click an element.
@@ -150,7 +395,33 @@ class BrowserController:
             else:
                 await self.page.wait_for_selector(selector)
             return True
-        except:
+        except PlaywrightError:
+            return False
+            
+    async def wait_until_ready(self, selector: str = None, timeout: int = 5000) -> bool:
+        """
+        Wait until the page is ready for interaction.
+        
+        Waits for the selector to become visible when one is given, otherwise
+        (or if it never shows up) for the network to go idle.
+        
+        Args:
+            selector: CSS selector of an element the ready page shows
+            timeout: Maximum time to wait in ms for each condition
+            
+        Returns:
+            True if the page became ready, False if waiting timed out
+        """
+        if selector:
+            try:
+                await self.page.wait_for_selector(selector, state="visible", timeout=timeout)
+                return True
+            except PlaywrightError:
+                pass
+        try:
+            await self.page.wait_for_load_state("networkidle", timeout=timeout)
+            return True
+        except PlaywrightError:
             return False
             
     async def wait_for_timeout(self, ms: int):
@@ -171,6 +442,64 @@ class BrowserController:
         """
         return await self.page.content()
         
+    async def get_dom_gzip(self) -> bytes:
+        """
+        Get the current DOM as gzip-compressed HTML.
+        
+        The page compresses its own HTML, so only the compressed bytes cross
+        the browser connection. Falls back to compressing get_dom() locally
+        when the page cannot.
+        
+        Returns:
+            Gzip-compressed page HTML
+        """
+        try:
+            encoded = await self.evaluate_js("""
+                async () => {
+                    const doctype = document.doctype
+                        ? new XMLSerializer().serializeToString(document.doctype)
+                        : '';
+                    const html = doctype + document.documentElement.outerHTML;
+                    const stream = new Blob([html]).stream()
+                        .pipeThrough(new CompressionStream('gzip'));
+                    const blob = await new Response(stream).blob();
+                    const url = await new Promise((resolve, reject) => {
+                        const reader = new FileReader();
+                        reader.onload = () => resolve(reader.result);
+                        reader.onerror = () => reject(reader.error);
+                        reader.readAsDataURL(blob);
+                    });
+                    return url.slice(url.indexOf(',') + 1);
+                }
+            """)
+            return base64.b64decode(encoded)
+        except Exception:
+            dom = await self.get_dom()
+            return await asyncio.to_thread(gzip.compress, dom.encode('utf-8'))
+            
+    async def get_dom_fingerprint(self) -> Dict[str, Any]:
+        """
+        Get the DOM size and a content hash without transferring the HTML.
+        
+        Returns:
+            Dictionary with the serialized DOM length and a 53-bit hex hash
+        """
+        return await self.evaluate_js("""
+            () => {
+                const html = document.documentElement.outerHTML;
+                let h1 = 0xdeadbeef, h2 = 0x41c6ce57;
+                for (let i = 0; i < html.length; i++) {
+                    const ch = html.charCodeAt(i);
+                    h1 = Math.imul(h1 ^ ch, 2654435761);
+                    h2 = Math.imul(h2 ^ ch, 1597334677);
+                }
+                h1 = Math.imul(h1 ^ (h1 >>> 16), 2246822507) ^ Math.imul(h2 ^ (h2 >>> 13), 3266489909);
+                h2 = Math.imul(h2 ^ (h2 >>> 16), 2246822507) ^ Math.imul(h1 ^ (h1 >>> 13), 3266489909);
+                const hash = 4294967296 * (2097151 & h2) + (h1 >>> 0);
+                return {length: html.length, hash: hash.toString(16)};
+            }
+        """)
+        
     async def get_element_text(self, selector: str) -> Optional[str]:
         """
         Get text content of an element.
@@ -185,7 +514,7 @@ class BrowserController:
             element = await self.page.query_selector(selector)
             if element:
                 return await element.text_content()
-        except:
+        except PlaywrightError:
             pass
         return None
         
@@ -204,7 +533,7 @@ class BrowserController:
             element = await self.page.query_selector(selector)
             if element:
                 return await element.get_attribute(attribute)
-        except:
+        except PlaywrightError:
             pass
         return None
         
@@ -218,22 +547,23 @@ class BrowserController:
         Returns:
             List of element info dictionaries
         """
-        elements = []
+        # One round-trip for all elements instead of three per element
         try:
-            handles = await self.page.query_selector_all(selector)
-            for i, handle in enumerate(handles):
-                box = await handle.bounding_box()
-                text = await handle.text_content()
-                tag = await handle.evaluate("el => el.tagName.toLowerCase()")
-                elements.append({
-                    "index": i,
-                    "tag": tag,
-                    "text": text.strip() if text else "",
-                    "box": box
+            return await self.page.evaluate("""
+                (selector) => Array.from(document.querySelectorAll(selector), (el, i) => {
+                    const rect = el.getBoundingClientRect();
+                    return {
+                        index: i,
+                        tag: el.tagName.toLowerCase(),
+                        text: (el.textContent || '').trim(),
+                        box: el.getClientRects().length
+                            ? {x: rect.x, y: rect.y, width: rect.width, height: rect.height}
+                            : null
+                    };
                 })
-        except:
-            pass
-        return elements
+            """, selector)
+        except PlaywrightError:
+            return []
         
     async def evaluate_js(self, script: str) -> Any:
         """
@@ -247,39 +577,46 @@ class BrowserController:
         """
         return await self.page.evaluate(script)
         
-    async def get_game_state(self) -> Dict[str, Any]:
+    async def snapshot_page(self) -> Dict[str, Any]:
         """
-        Extract current game state from the page.
-        Looks for common game elements like scores, timers, etc.
+        Collect game state and interactive elements in one page round-trip.
+        
+        Returns:
+            Dictionary with score (text or None), visible_text (control
+            labels) and interactive_elements (element details)
+        """
+        snapshot = await self.evaluate_js(_SNAPSHOT_CALL)
+        if snapshot is None:
+            # Document loaded before the init script was added
+            snapshot = await self.evaluate_js(_SNAPSHOT_JS + _SNAPSHOT_CALL)
+        return snapshot
+        
+    @staticmethod
+    def game_state_from_snapshot(snapshot: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Extract the get_game_state result from a snapshot_page result.
         
+        Args:
+            snapshot: Result of snapshot_page
+            
         Returns:
             Dictionary with game state information
         """
         state = {}
+        if snapshot.get("score") is not None:
+            state['score'] = snapshot["score"]
+        state['visible_text'] = snapshot.get("visible_text", [])
+        return state
         
-        # Try to find score elements
-        score_selectors = ['[class*="score"]', '[id*="score"]', '.score', '#score']
-        for selector in score_selectors:
-            text = await self.get_element_text(selector)
-            if text:
-                state['score'] = text.strip()
-                break
-                
-        # Try to find any visible text elements that might be game controls
-        state['visible_text'] = await self.evaluate_js("""
-            () => {
-                const texts = [];
-                document.querySelectorAll('button, [role="button"], .btn, a').forEach(el => {
-                    const text = el.textContent?.trim();
-                    if (text && text.length < 50) {
-                        texts.push(text);
-                    }
-                });
-                return texts.slice(0, 20);
-            }
-        """)
+    async def get_game_state(self) -> Dict[str, Any]:
+        """
+        Extract current game state from the page.
+        Looks for common game elements like scores, timers, etc.
         
-        return state
+        Returns:
+            Dictionary with game state information
+        """
+        return self.game_state_from_snapshot(await self.snapshot_page())
         
     async def find_interactive_elements(self) -> List[Dict]:
         """
@@ -288,71 +625,91 @@ class BrowserController:
         Returns:
             List of interactive element details
         """
-        return await self.evaluate_js("""
-            () => {
-                const elements = [];
-                const interactable = document.querySelectorAll(
-                    'button, a, input, [onclick], [role="button"], [tabindex], canvas, .clickable, [class*="tile"], [class*="cell"], [class*="card"]'
-                );
-                
-                interactable.forEach((el, i) => {
-                    const rect = el.getBoundingClientRect();
-                    if (rect.width > 0 && rect.height > 0) {
-                        elements.push({
-                            index: i,
-                            tag: el.tagName.toLowerCase(),
-                            id: el.id || null,
-                            class: el.className || null,
-                            text: el.textContent?.trim().slice(0, 100) || null,
-                            x: rect.x + rect.width / 2,
-                            y: rect.y + rect.height / 2,
-                            width: rect.width,
-                            height: rect.height
-                        });
-                    }
-                });
-                
-                return elements.slice(0, 100);
-            }
-        """)
+        return (await self.snapshot_page())["interactive_elements"]
         
     def get_console_logs(self) -> List[Dict]:
         """Get captured console logs."""
-        return self.console_logs.copy()
+        return [
+            {
+                "timestamp": _iso_from_ns(ts_ns),
+                "type": message_type,
+                "text": text,
+                "location": str(location)
+            }
+            for ts_ns, message_type, text, location in list(self.console_logs)
+        ]
         
     def get_network_logs(self) -> List[Dict]:
         """Get captured network logs."""
-        return self.network_logs.copy()
+        logs = []
+        for event, params in list(self.network_logs):
+            if event == "request":
+                ts_ns, url, method, resource_type = params
+                logs.append({
+                    "timestamp": _iso_from_ns(ts_ns),
+                    "type": "request",
+                    "url": url,
+                    "method": method,
+                    "resource_type": resource_type
+                })
+            elif event == "response":
+                ts_ns, url, status = params
+                logs.append({
+                    "timestamp": _iso_from_ns(ts_ns),
+                    "type": "response",
+                    "url": url,
+                    "status": status
+                })
+            elif event == _CDP_REQUEST:
+                wall_time = params.get("wallTime", 0)
+                request = params.get("request", {})
+                logs.append({
+                    "timestamp": datetime.fromtimestamp(wall_time).isoformat(),
+                    "type": "request",
+                    "url": request.get("url"),
+                    "method": request.get("method"),
+                    "resource_type": params.get("type", "other").lower()
+                })
+            else:
+                clock_offset, params = params
+                wall_time = params.get("timestamp", 0) + clock_offset
+                response = params.get("response", {})
+                logs.append({
+                    "timestamp": datetime.fromtimestamp(wall_time).isoformat(),
+                    "type": "response",
+                    "url": response.get("url"),
+                    "status": response.get("status")
+                })
+        return logs
         
     def clear_logs(self):
         """Clear captured logs."""
-        self.console_logs = []
-        self.network_logs = []
+        self.console_logs.clear()
+        self.network_logs.clear()
         
     def _handle_console(self, message):
         """Handle console messages."""
-        self.console_logs.append({
-            "timestamp": datetime.now().isoformat(),
-            "type": message.type,
-            "text": message.text,
-            "location": str(message.location)
-        })
+        self.console_logs.append(
+            (time.time_ns(), message.type, message.text, message.location)
+        )
+        
+    def _handle_cdp_request(self, params):
+        """Buffer a CDP request event, learning the wall-clock offset from it."""
+        self._cdp_clock_offset = params.get("wallTime", 0) - params.get("timestamp", 0)
+        self.network_logs.append((_CDP_REQUEST, params))
+        
+    def _handle_cdp_response(self, params):
+        """Buffer a CDP response event with the clock offset known at capture."""
+        self.network_logs.append((_CDP_RESPONSE, (self._cdp_clock_offset, params)))
         
     def _handle_request(self, request):
         """Handle network requests."""
-        self.network_logs.append({
-            "timestamp": datetime.now().isoformat(),
-            "type": "request",
-            "url": request.url,
-            "method": request.method,
-            "resource_type": request.resource_type
-        })
+        self.network_logs.append(
+            ("request", (time.time_ns(), request.url, request.method, request.resource_type))
+        )
         
     def _handle_response(self, response):
         """Handle network responses."""
-        self.network_logs.append({
-            "timestamp": datetime.now().isoformat(),
-            "type": "response",
-            "url": response.url,
-            "status": response.status
-        })
+        self.network_logs.append(
+            ("response", (time.time_ns(), response.url, response.status))
+        )
@@ -2,7 +2,8 @@
 Configuration settings for the Multi-Agent Game Tester
 """
 import os
-from pydantic_settings import BaseSettings
+from functools import lru_cache
+from pydantic_settings import BaseSettings, SettingsConfigDict
 from pathlib import Path
 
 
@@ -22,11 +23,15 @@ class Settings(BaseSettings):
     # Ollama settings
     OLLAMA_HOST: str = "http://localhost:11434"
     OLLAMA_MODEL: str = "llava"
-    OLLAMA_TEXT_MODEL: str = "llama3.2"
+    # Pin the 4-bit quant explicitly; decode speed is bound by weight size
+    OLLAMA_TEXT_MODEL: str = "llama3.2:3b-instruct-q4_K_M"
     
     # Browser settings
     BROWSER_HEADLESS: bool = False
     BROWSER_TIMEOUT: int = 30000  # ms
+    SCREENSHOT_QUALITY: int = 80  # JPEG quality for step screenshots
+    MAX_LOG_ENTRIES: int = 10000  # per console/network log buffer
+    ENABLE_TRACE: bool = False  # Record Playwright traces to ARTIFACTS_DIR/traces
     
     # Test settings
     MIN_TEST_CASES: int = 20
@@ -35,15 +40,33 @@ class Settings(BaseSettings):
     
     # ChromaDB
     CHROMA_COLLECTION: str = "game_patterns"
+    # sentence-transformers model to embed with outside Chroma, e.g.
+    # "all-MiniLM-L6-v2"; empty uses Chroma's built-in embedding. Keep it
+    # fixed for a store, vectors from different models do not mix
+    EMBEDDING_MODEL: str = ""
     
-    class Config:
-        env_file = ".env"
-        extra = "allow"
+    # Planner/ranker results persisted across runs (seconds; 0 disables)
+    RESULT_CACHE_TTL: int = 86400
+    
+    # Read-only once loaded; override values through the environment
+    model_config = SettingsConfigDict(env_file=".env", extra="allow", frozen=True)
+
 
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """
+    Load settings once per process.
+    
+    Environment and .env parsing and directory creation happen only on
+    the first call.
+    """
+    loaded = Settings()
+    
+    # Ensure directories exist
+    loaded.ARTIFACTS_DIR.mkdir(parents=True, exist_ok=True)
+    loaded.REPORTS_DIR.mkdir(parents=True, exist_ok=True)
+    loaded.RAG_DIR.mkdir(parents=True, exist_ok=True)
+    return loaded
 
-settings = Settings()
 
-# Ensure directories exist
-settings.ARTIFACTS_DIR.mkdir(parents=True, exist_ok=True)
-settings.REPORTS_DIR.mkdir(parents=True, exist_ok=True)
-settings.RAG_DIR.mkdir(parents=True, exist_ok=True)
+settings = get_settings()
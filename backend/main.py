@@ -2,14 +2,16 @@
 FastAPI Main Application - Multi-Agent Game Tester
 """
 import asyncio
+import logging
+import os
 import uuid
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Awaitable, Dict, Optional
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, HttpUrl
 
@@ -21,7 +23,12 @@ from .agents.ranker_agent import RankerAgent
 from .agents.executor_agent import ExecutorAgent
 from .agents.analyzer_agent import AnalyzerAgent
 from .browser.controller import BrowserController
+from .browser.browser_pool import BrowserPool
 from .rag.knowledge_base import KnowledgeBase
+from .utils.cache import TTLCache
+from .utils import jsonlib
+
+logger = logging.getLogger(__name__)
 
 
 app = FastAPI(
@@ -47,10 +54,58 @@ if frontend_path.exists():
 # Session storage (in-memory for POC)
 sessions = {}
 
+# Background jobs by session id, for requests made with background=true
+jobs: Dict[str, asyncio.Task] = {}
+
+# Artifact listings keyed by (session id, directory mtime)
+_artifact_listing_cache = TTLCache(maxsize=256, ttl=2.0)
+
+# Warm browser shared by game analysis requests
+browser_pool = BrowserPool()
+
+
+@app.on_event("startup")
+async def start_browser_pool():
+    """Launch the shared browser ahead of the first analysis request."""
+    try:
+        await browser_pool.start()
+    except Exception as e:
+        # acquire() retries the launch on first use
+        logger.warning("Browser pool warm-up failed: %s", e, exc_info=True)
+
+
+@app.on_event("shutdown")
+async def stop_browser_pool():
+    """Close the shared browser."""
+    await browser_pool.stop()
+
+
+def _start_job(session_id: str, work: Awaitable) -> JSONResponse:
+    """
+    Run a session's work in the background and answer 202 Accepted.
+    
+    The work records its own status and errors on the session.
+    """
+    async def run():
+        try:
+            await work
+        except Exception:
+            pass  # Already recorded on the session
+        finally:
+            jobs.pop(session_id, None)
+            
+    jobs[session_id] = asyncio.create_task(run())
+    return JSONResponse(status_code=202, content={
+        "session_id": session_id,
+        "status": "queued",
+        "status_url": f"/api/session/{session_id}/status"
+    })
+
 
 # Request/Response Models
 class GameAnalysisRequest(BaseModel):
     url: str
+    background: bool = False  # Queue and return 202 instead of waiting
     
 class TestGenerationRequest(BaseModel):
     session_id: str
@@ -58,6 +113,7 @@ class TestGenerationRequest(BaseModel):
 class TestExecutionRequest(BaseModel):
     session_id: str
     test_ids: Optional[list[int]] = None  # If None, execute all ranked tests
+    background: bool = False  # Queue and return 202 instead of waiting
     
 class SessionResponse(BaseModel):
     session_id: str
@@ -80,47 +136,67 @@ async def analyze_game(request: GameAnalysisRequest):
     """
     Analyze a game from the given URL.
     Creates a new session and returns game analysis.
+    
+    With background=true the analysis is queued and 202 is returned at once;
+    poll /api/session/{session_id}/status for progress.
     """
     session_id = str(uuid.uuid4())[:8]
     
+    # Create session
+    sessions[session_id] = {
+        "id": session_id,
+        "url": request.url,
+        "status": "queued" if request.background else "analyzing",
+        "created_at": datetime.now().isoformat(),
+        "game_analysis": None,
+        "test_cases": [],
+        "ranked_tests": [],
+        "execution_results": [],
+        "report": None
+    }
+    
+    if request.background:
+        return _start_job(session_id, _analyze_session(session_id))
+        
+    try:
+        analysis = await _analyze_session(session_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+        
+    return SessionResponse(
+        session_id=session_id,
+        status="analyzed",
+        message=f"Game analyzed successfully. Found {analysis.get('element_count', 0)} interactive elements."
+    )
+
+
+async def _analyze_session(session_id: str) -> dict:
+    """Run game analysis for a session, recording the outcome on it."""
+    session = sessions[session_id]
+    session["status"] = "analyzing"
+    
     try:
         # Initialize components
-        browser = BrowserController()
         knowledge_base = KnowledgeBase()
         game_analyzer = GameAnalyzerAgent(knowledge_base)
         
-        # Create session
-        sessions[session_id] = {
-            "id": session_id,
-            "url": request.url,
-            "status": "analyzing",
-            "created_at": datetime.now().isoformat(),
-            "game_analysis": None,
-            "test_cases": [],
-            "ranked_tests": [],
-            "execution_results": [],
-            "report": None
-        }
-        
-        # Analyze game
-        await browser.start()
-        analysis = await game_analyzer.analyze(browser, request.url, session_id)
-        await browser.stop()
-        
-        sessions[session_id]["game_analysis"] = analysis
-        sessions[session_id]["status"] = "analyzed"
-        
-        return SessionResponse(
-            session_id=session_id,
-            status="analyzed",
-            message=f"Game analyzed successfully. Found {analysis.get('element_count', 0)} interactive elements."
-        )
+        # Analyze game in a fresh context on the shared browser
+        context = await browser_pool.acquire()
+        browser = None
+        try:
+            browser = await BrowserController.from_context(context)
+            analysis = await game_analyzer.analyze(browser, session["url"], session_id)
+        finally:
+            await browser_pool.release(context, browser)
+            
+        session["game_analysis"] = analysis
+        session["status"] = "analyzed"
+        return analysis
         
     except Exception as e:
-        if session_id in sessions:
-            sessions[session_id]["status"] = "error"
-            sessions[session_id]["error"] = str(e)
-        raise HTTPException(status_code=500, detail=str(e))
+        session["status"] = "error"
+        session["error"] = str(e)
+        raise
 
 
 @app.post("/api/generate-tests")
@@ -211,6 +287,9 @@ async def rank_tests(request: TestGenerationRequest):
 async def execute_tests(request: TestExecutionRequest):
     """
     Execute the ranked test cases.
+    
+    With background=true execution is queued and 202 is returned at once;
+    poll /api/session/{session_id}/status for progress.
     """
     session_id = request.session_id
     
@@ -222,6 +301,30 @@ async def execute_tests(request: TestExecutionRequest):
     if not session.get("ranked_tests"):
         raise HTTPException(status_code=400, detail="No ranked tests available")
     
+    if session_id in jobs:
+        raise HTTPException(status_code=409, detail="Session has a job in progress")
+        
+    if request.background:
+        session["status"] = "queued"
+        return _start_job(session_id, _execute_session(session_id))
+        
+    try:
+        results = await _execute_session(session_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+        
+    return {
+        "session_id": session_id,
+        "status": "tests_executed",
+        "results_count": len(results),
+        "results": results
+    }
+
+
+async def _execute_session(session_id: str) -> list:
+    """Execute a session's ranked tests, recording the outcome on it."""
+    session = sessions[session_id]
+    
     try:
         session["status"] = "executing_tests"
         
@@ -238,18 +341,12 @@ async def execute_tests(request: TestExecutionRequest):
         
         session["execution_results"] = results
         session["status"] = "tests_executed"
-        
-        return {
-            "session_id": session_id,
-            "status": "tests_executed",
-            "results_count": len(results),
-            "results": results
-        }
+        return results
         
     except Exception as e:
         session["status"] = "error"
         session["error"] = str(e)
-        raise HTTPException(status_code=500, detail=str(e))
+        raise
 
 
 @app.get("/api/report/{session_id}")
@@ -277,7 +374,12 @@ async def get_report(session_id: str):
             )
             session["report"] = report
         
-        return session["report"]
+        # Encode directly; returning the dict would make FastAPI walk the
+        # whole report through jsonable_encoder before serializing it
+        return Response(
+            content=jsonlib.dump_bytes(session["report"], default=str),
+            media_type="application/json"
+        )
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -294,6 +396,23 @@ async def get_session(session_id: str):
     return sessions[session_id]
 
 
+@app.get("/api/session/{session_id}/status")
+async def get_session_status(session_id: str):
+    """
+    Get a session's status without its (potentially large) data.
+    """
+    if session_id not in sessions:
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    session = sessions[session_id]
+    return {
+        "session_id": session_id,
+        "status": session["status"],
+        "running": session_id in jobs,
+        "error": session.get("error")
+    }
+
+
 @app.get("/api/artifacts/{session_id}")
 async def get_artifacts(session_id: str):
     """
@@ -301,33 +420,83 @@ async def get_artifacts(session_id: str):
     """
     artifacts_path = settings.ARTIFACTS_DIR / session_id
     
-    if not artifacts_path.exists():
+    try:
+        dir_mtime = os.stat(artifacts_path).st_mtime_ns
+    except OSError:
         return {"artifacts": []}
     
-    artifacts = []
-    for file in artifacts_path.glob("**/*"):
-        if file.is_file():
-            artifacts.append({
-                "name": file.name,
-                "path": str(file.relative_to(settings.ARTIFACTS_DIR)),
-                "size": file.stat().st_size,
-                "type": file.suffix[1:] if file.suffix else "unknown"
-            })
-    
+    # Polling clients hit this repeatedly; re-walk only when files were
+    # added or removed, or after the short TTL (sizes of files rewritten
+    # in place do not change the directory mtime)
+    cache_key = (session_id, dir_mtime)
+    artifacts = _artifact_listing_cache.get(cache_key)
+    if artifacts is None:
+        artifacts = _list_artifacts(artifacts_path)
+        _artifact_listing_cache.set(cache_key, artifacts)
+        
     return {"artifacts": artifacts}
 
 
+def _list_artifacts(artifacts_path: Path) -> list:
+    """
+    Walk an artifacts directory with os.scandir.
+    
+    DirEntry objects carry the file type from the directory read, so only
+    files need a stat call (for their size).
+    """
+    artifacts = []
+    root = str(settings.ARTIFACTS_DIR)
+    stack = [str(artifacts_path)]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file():
+                    suffix = os.path.splitext(entry.name)[1]
+                    artifacts.append({
+                        "name": entry.name,
+                        "path": os.path.relpath(entry.path, root),
+                        "size": entry.stat().st_size,
+                        "type": suffix[1:] if suffix else "unknown"
+                    })
+                    
+    return artifacts
+
+
 @app.get("/api/artifacts/{session_id}/{filename:path}")
-async def get_artifact_file(session_id: str, filename: str):
+async def get_artifact_file(session_id: str, filename: str, request: Request):
     """
     Get a specific artifact file.
+    
+    Responses carry an ETag, so a client re-fetching an unchanged
+    artifact gets 304 Not Modified instead of the file again.
     """
     file_path = settings.ARTIFACTS_DIR / session_id / filename
     
-    if not file_path.exists():
+    try:
+        stat = file_path.stat()
+    except OSError:
         raise HTTPException(status_code=404, detail="Artifact not found")
+        
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    # Artifacts such as index.jsonl change in place, so clients must
+    # revalidate every time; unchanged files still come back as 304
+    headers = {"etag": etag, "cache-control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
     
-    return FileResponse(str(file_path))
+    media_type = None
+    if file_path.name.endswith(".html.gz"):
+        # DOM snapshots are stored gzipped; let the browser inflate them
+        headers["content-encoding"] = "gzip"
+        media_type = "text/html"
+        
+    # Passing the stat avoids a second one; the body is sent with sendfile
+    # where the server supports it
+    return FileResponse(
+        str(file_path), headers=headers, media_type=media_type, stat_result=stat
+    )
 
 
 @app.get("/health")
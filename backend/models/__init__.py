@@ -1,6 +1,27 @@
 """Models package"""
-from .test_case import TestCase
-from .execution_result import ExecutionResult
-from .report import Report
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .test_case import TestCase
+    from .execution_result import ExecutionResult
+    from .report import Report
+
+# Submodules are imported on first attribute access (PEP 562), so code that
+# only needs one model does not load the others
+_LAZY_IMPORTS = {
+    "TestCase": ".test_case",
+    "ExecutionResult": ".execution_result",
+    "Report": ".report",
+}
 
 __all__ = ["TestCase", "ExecutionResult", "Report"]
+
+
+def __getattr__(name: str):
+    module = _LAZY_IMPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
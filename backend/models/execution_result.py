@@ -2,12 +2,14 @@
 Execution Result Data Model
 """
 from typing import List, Dict, Optional, Any
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class StepResult(BaseModel):
     """Result of a single test step."""
     
+    model_config = ConfigDict(frozen=True, defer_build=True)
+    
     index: int
     description: str
     status: str = "pending"
@@ -19,6 +21,8 @@ class StepResult(BaseModel):
 class RunResult(BaseModel):
     """Result of a single test run."""
     
+    model_config = ConfigDict(defer_build=True)
+    
     run_index: int
     status: str
     steps: List[StepResult] = Field(default_factory=list)
@@ -31,6 +35,8 @@ class RunResult(BaseModel):
 class CrossValidation(BaseModel):
     """Cross-agent validation result."""
     
+    model_config = ConfigDict(defer_build=True)
+    
     status: str
     agrees_with_primary: bool
     primary_statuses: List[str] = Field(default_factory=list)
@@ -41,6 +47,8 @@ class CrossValidation(BaseModel):
 class Verdict(BaseModel):
     """Final test verdict."""
     
+    model_config = ConfigDict(frozen=True, defer_build=True)
+    
     result: str  # PASS, FAIL, FLAKY, INCONCLUSIVE
     confidence: int = 0  # 0-100
     reason: str = ""
@@ -52,6 +60,8 @@ class Verdict(BaseModel):
 class ExecutionResult(BaseModel):
     """Complete execution result for a test case."""
     
+    model_config = ConfigDict(extra="allow", defer_build=True)
+    
     test_id: int
     test_name: str
     runs: List[RunResult] = Field(default_factory=list)
@@ -60,5 +70,6 @@ class ExecutionResult(BaseModel):
     reproducibility: float = 0.0
     executed_at: Optional[str] = None
     
-    class Config:
-        extra = "allow"
+    def to_json(self) -> str:
+        """Serialize to JSON, leaving out None fields."""
+        return self.model_dump_json(exclude_none=True)
@@ -2,12 +2,14 @@
 Report Data Model
 """
 from typing import List, Dict, Optional, Any
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class GameInfo(BaseModel):
     """Game information in report."""
     
+    model_config = ConfigDict(defer_build=True)
+    
     url: str
     game_type: str
     element_count: int = 0
@@ -18,6 +20,8 @@ class GameInfo(BaseModel):
 class Summary(BaseModel):
     """Report summary."""
     
+    model_config = ConfigDict(frozen=True, defer_build=True)
+    
     total_tests: int
     passed: int
     failed: int
@@ -30,6 +34,8 @@ class Summary(BaseModel):
 class ReproducibilityStats(BaseModel):
     """Reproducibility statistics."""
     
+    model_config = ConfigDict(defer_build=True)
+    
     average_reproducibility: float
     min_reproducibility: float
     max_reproducibility: float
@@ -40,6 +46,8 @@ class ReproducibilityStats(BaseModel):
 class TriageNote(BaseModel):
     """Triage note for failed/flaky test."""
     
+    model_config = ConfigDict(defer_build=True)
+    
     test_id: int
     test_name: str
     severity: str  # HIGH, MEDIUM, LOW
@@ -52,6 +60,8 @@ class TriageNote(BaseModel):
 class ArtifactsSummary(BaseModel):
     """Summary of captured artifacts."""
     
+    model_config = ConfigDict(defer_build=True)
+    
     total_artifacts: int
     types: Dict[str, int] = Field(default_factory=dict)
     directory: Optional[str] = None
@@ -60,6 +70,8 @@ class ArtifactsSummary(BaseModel):
 class Report(BaseModel):
     """Complete test report."""
     
+    model_config = ConfigDict(extra="allow", defer_build=True)
+    
     report_id: str
     session_id: str
     generated_at: str
@@ -72,5 +84,6 @@ class Report(BaseModel):
     artifacts_summary: ArtifactsSummary
     report_path: Optional[str] = None
     
-    class Config:
-        extra = "allow"
+    def to_json(self) -> str:
+        """Serialize to JSON, leaving out None fields."""
+        return self.model_dump_json(exclude_none=True)
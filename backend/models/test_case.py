@@ -2,12 +2,14 @@
 Test Case Data Model
 """
 from typing import List, Optional
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class TestCase(BaseModel):
     """Data model for a test case."""
     
+    model_config = ConfigDict(extra="allow", defer_build=True)
+    
     id: int = Field(..., description="Unique test case ID")
     name: str = Field(..., description="Test case name")
     description: str = Field(default="", description="Test description")
@@ -26,6 +28,3 @@ class TestCase(BaseModel):
     
     # Metadata
     generated_at: Optional[str] = Field(default=None, description="Generation timestamp")
-    
-    class Config:
-        extra = "allow"
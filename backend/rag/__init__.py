@@ -1,4 +1,5 @@
 """RAG package"""
 from .knowledge_base import KnowledgeBase
+from .persistent_cache import PersistentCache
 
-__all__ = ["KnowledgeBase"]
+__all__ = ["KnowledgeBase", "PersistentCache"]
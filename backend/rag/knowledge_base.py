@@ -2,11 +2,18 @@
 Knowledge Base - RAG system for progressive learning
 Uses ChromaDB for vector storage of game patterns and test strategies.
 """
-import json
+import copy
+import logging
+import os
+import re
+import threading
+from collections import Counter
+from contextlib import contextmanager
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import Any, Callable, Dict, List, Optional, Set
 from datetime import datetime
 import hashlib
+from functools import lru_cache
 
 try:
     import chromadb
@@ -15,7 +22,85 @@ try:
 except ImportError:
     CHROMA_AVAILABLE = False
 
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
 from ..config import settings
+from ..utils import jsonlib
+from ..utils.cache import TTLCache
+
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"\w+")
+
+# Chroma search and get_successful_strategies results, keyed with a
+# generation counter that every write in this process bumps; the TTL bounds
+# staleness from writes made by other processes. Searches run in worker
+# threads, so the caches are only touched under the lock
+_query_cache = TTLCache(maxsize=512, ttl=300)
+_strategies_cache = TTLCache(maxsize=128, ttl=300)
+_cache_lock = threading.Lock()
+_pattern_generation = 0
+
+
+def _patterns_changed():
+    """Invalidate cached searches after a write."""
+    global _pattern_generation
+    with _cache_lock:
+        _pattern_generation += 1
+
+
+# Serializes file store writes in this process; flock extends that to other
+# processes sharing RAG_DIR where it is available
+_file_store_lock = threading.Lock()
+
+
+@contextmanager
+def _store_lock(lock_path: Path):
+    """Hold the exclusive write lock of a file store."""
+    with _file_store_lock:
+        if not FCNTL_AVAILABLE:
+            yield
+            return
+        with open(lock_path, "ab") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+
+
+@lru_cache(maxsize=1)
+def _configured_embedder() -> Optional[Callable[[List[str]], List[List[float]]]]:
+    """
+    Shared batch embedder for settings.EMBEDDING_MODEL, or None.
+    
+    Loaded once per process; the model is expensive to construct and
+    KnowledgeBase instances are created per request.
+    """
+    if not settings.EMBEDDING_MODEL or not CHROMA_AVAILABLE:
+        return None
+    try:
+        from chromadb.utils.embedding_functions import SentenceTransformerEmbeddingFunction
+        return SentenceTransformerEmbeddingFunction(model_name=settings.EMBEDDING_MODEL)
+    except Exception as e:
+        logger.warning(
+            "Embedding model init failed: %s, using Chroma's built-in embedding", e,
+            exc_info=True
+        )
+        return None
+
+
+@lru_cache(maxsize=1024)
+def _content_id(content: str) -> str:
+    """
+    12-hex-char ID for content.
+    
+    The ID only needs to be stable, not cryptographic; a 6-byte BLAKE2b
+    digest yields exactly 12 hex chars without truncating a longer one.
+    """
+    return hashlib.blake2b(content.encode(), digest_size=6).hexdigest()
 
 
 class KnowledgeBase:
@@ -24,8 +109,19 @@ class KnowledgeBase:
     Enables progressive learning by storing successful test patterns.
     """
     
-    def __init__(self):
-        """Initialize the knowledge base."""
+    def __init__(self, embedding_function: Optional[Callable[[List[str]], List[List[float]]]] = None):
+        """
+        Initialize the knowledge base.
+        
+        Args:
+            embedding_function: Optional batch embedder mapping texts to
+                vectors. When given, documents and queries are embedded
+                with it in one call per batch and Chroma's built-in
+                embedding is skipped. Use the same one for the life of a
+                store; vectors from different models are not comparable.
+                Defaults to the settings.EMBEDDING_MODEL embedder, if any.
+        """
+        self.embedding_function = embedding_function or _configured_embedder()
         self.rag_dir = settings.RAG_DIR
         self.rag_dir.mkdir(parents=True, exist_ok=True)
         
@@ -36,8 +132,7 @@ class KnowledgeBase:
             self._init_chroma()
         else:
             # Fallback to file-based storage
-            self.patterns_file = self.rag_dir / "patterns.json"
-            self.patterns = self._load_patterns()
+            self._init_file_store()
             
     def _init_chroma(self):
         """Initialize ChromaDB client and collection."""
@@ -52,28 +147,112 @@ class KnowledgeBase:
         except Exception as e:
             print(f"ChromaDB init failed: {e}, using file-based fallback")
             self.client = None
-            self.patterns_file = self.rag_dir / "patterns.json"
-            self.patterns = self._load_patterns()
+            self._init_file_store()
             
+    def _init_file_store(self):
+        """Set up the file-based fallback store."""
+        # Append-only JSON Lines; later records for an id replace earlier ones
+        self.patterns_file = self.rag_dir / "patterns.jsonl"
+        self._legacy_patterns_file = self.rag_dir / "patterns.json"
+        self._lock_file = self.rag_dir / "patterns.lock"
+        self.patterns = self._load_patterns()
+        # Lowercased token -> positions in self.patterns, for text search
+        self._token_index: Dict[str, Set[int]] = {}
+        self._index_patterns(0)
+        
     def _load_patterns(self) -> List[Dict]:
-        """Load patterns from file."""
-        if hasattr(self, 'patterns_file') and self.patterns_file.exists():
-            try:
-                return json.loads(self.patterns_file.read_text())
-            except:
-                pass
-        return []
+        """Load patterns from file, counting its records in self._file_records."""
+        self._file_records = 0
+        if not self.patterns_file.exists():
+            # Stores written before the switch to JSON Lines
+            if self._legacy_patterns_file.exists():
+                try:
+                    return jsonlib.loads(self._legacy_patterns_file.read_bytes())
+                except (OSError, ValueError):
+                    pass
+            return []
+            
+        by_id: Dict[Any, Dict] = {}
+        try:
+            with open(self.patterns_file, "rb") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        record = jsonlib.loads(line)
+                    except ValueError:
+                        continue  # Torn final line from an interrupted write
+                    by_id[record.get("id")] = record
+                    self._file_records += 1
+        except OSError:
+            pass
+        return list(by_id.values())
         
-    def _save_patterns(self):
-        """Save patterns to file."""
-        if hasattr(self, 'patterns_file'):
-            self.patterns_file.write_text(
-                json.dumps(self.patterns, indent=2, default=str)
-            )
+    def _append_patterns(self, records: List[Dict]):
+        """
+        Append records to the patterns file.
+        
+        Each write costs only the new records instead of rewriting the
+        whole store; the file is compacted once superseded records make up
+        more than half of it.
+        """
+        with _store_lock(self._lock_file):
+            if not self.patterns_file.exists() and self._legacy_patterns_file.exists():
+                # First write after upgrading: carry the old store over
+                self._rewrite_file(self._load_patterns())
+            with open(self.patterns_file, "ab") as f:
+                f.write(b"".join(jsonlib.dump_bytes(r, default=str) + b"\n" for r in records))
+            self._file_records += len(records)
+            if self._file_records > 2 * len(self.patterns) + 100:
+                self._compact()
+                
+    def compact(self):
+        """
+        Rewrite the patterns file with only the latest record per id.
+        
+        The file is re-read under the store lock, so records appended by
+        other instances since this one loaded are kept, and self.patterns
+        is refreshed from it.
+        """
+        if not hasattr(self, 'patterns_file'):
+            return
+        with _store_lock(self._lock_file):
+            self._compact()
+            
+    def _compact(self):
+        """Body of compact(); the caller holds the store lock."""
+        self.patterns = self._load_patterns()
+        self._rewrite_file(self.patterns)
+        self._token_index = {}
+        self._index_patterns(0)
+        
+    def _rewrite_file(self, patterns: List[Dict]):
+        """Atomically replace the patterns file, dropping the legacy one."""
+        tmp_path = self.patterns_file.with_suffix(".jsonl.tmp")
+        tmp_path.write_bytes(
+            b"".join(jsonlib.dump_bytes(p, default=str) + b"\n" for p in patterns)
+        )
+        os.replace(tmp_path, self.patterns_file)
+        self._file_records = len(patterns)
+        if self._legacy_patterns_file.exists():
+            self._legacy_patterns_file.unlink()
             
+    def _document_args(self, documents: List[str]) -> Dict[str, Any]:
+        """collection.add arguments for documents, with precomputed embeddings if possible."""
+        args: Dict[str, Any] = {"documents": documents}
+        if self.embedding_function is not None:
+            args["embeddings"] = self.embedding_function(documents)
+        return args
+        
+    def _query_args(self, queries: List[str]) -> Dict[str, Any]:
+        """collection.query arguments for queries, embedded up front if possible."""
+        if self.embedding_function is not None:
+            return {"query_embeddings": self.embedding_function(queries)}
+        return {"query_texts": queries}
+        
     def _generate_id(self, content: str) -> str:
         """Generate a unique ID from content."""
-        return hashlib.md5(content.encode()).hexdigest()[:12]
+        return _content_id(content)
         
     def add_game_pattern(
         self,
@@ -98,34 +277,77 @@ class KnowledgeBase:
         Returns:
             ID of the added pattern
         """
-        content = f"{game_type} {pattern_name} {description} {test_strategy}"
-        doc_id = self._generate_id(content)
-        
-        doc_metadata = {
+        return self.add_game_patterns_bulk([{
             "game_type": game_type,
             "pattern_name": pattern_name,
+            "description": description,
+            "test_strategy": test_strategy,
             "success_rate": success_rate,
-            "created_at": datetime.now().isoformat(),
-            **(metadata or {})
-        }
+            "metadata": metadata
+        }])[0]
         
+    def add_game_patterns_bulk(self, patterns: List[Dict]) -> List[str]:
+        """
+        Add many game patterns in a single write.
+        
+        Args:
+            patterns: Dicts with the add_game_pattern arguments as keys
+                (game_type, pattern_name, description, test_strategy and
+                optionally success_rate, metadata)
+            
+        Returns:
+            IDs of the added patterns, in input order
+        """
+        if not patterns:
+            return []
+            
+        created_at = datetime.now().isoformat()
+        ids, documents, metadatas, contents = [], [], [], []
+        
+        for pattern in patterns:
+            game_type = pattern["game_type"]
+            pattern_name = pattern["pattern_name"]
+            description = pattern["description"]
+            test_strategy = pattern["test_strategy"]
+            content = f"{game_type} {pattern_name} {description} {test_strategy}"
+            
+            ids.append(self._generate_id(content))
+            contents.append(content)
+            documents.append(f"{description}\n\nTest Strategy: {test_strategy}")
+            doc_metadata = {
+                "game_type": game_type,
+                "pattern_name": pattern_name,
+                "success_rate": pattern.get("success_rate", 0.0),
+                "created_at": created_at
+            }
+            if pattern.get("metadata"):
+                doc_metadata.update(pattern["metadata"])
+            metadatas.append(doc_metadata)
+            
         if self.collection:
             self.collection.add(
-                documents=[f"{description}\n\nTest Strategy: {test_strategy}"],
-                metadatas=[doc_metadata],
-                ids=[doc_id]
+                **self._document_args(documents),
+                metadatas=metadatas,
+                ids=ids
             )
+            _patterns_changed()
         else:
-            self.patterns.append({
-                "id": doc_id,
-                "content": content,
-                "description": description,
-                "test_strategy": test_strategy,
-                "metadata": doc_metadata
-            })
-            self._save_patterns()
+            records = [
+                {
+                    "id": doc_id,
+                    "content": content,
+                    "description": pattern["description"],
+                    "test_strategy": pattern["test_strategy"],
+                    "metadata": metadata
+                }
+                for doc_id, content, pattern, metadata in zip(ids, contents, patterns, metadatas)
+            ]
+            start = len(self.patterns)
+            self.patterns.extend(records)
+            self._index_patterns(start)
+            self._append_patterns(records)
             
-        return doc_id
+        return ids
         
     def add_test_result(
         self,
@@ -145,33 +367,67 @@ class KnowledgeBase:
             execution_time: Time taken to execute
             artifacts: References to artifacts
         """
-        content = f"Test: {test_case.get('name', 'Unknown')} Result: {result}"
-        doc_id = self._generate_id(f"{game_url}_{content}_{datetime.now().isoformat()}")
-        
-        doc_metadata = {
-            "type": "test_result",
+        self.add_test_results_batch([{
             "game_url": game_url,
-            "test_name": test_case.get("name", "Unknown"),
+            "test_case": test_case,
             "result": result,
             "execution_time": execution_time,
-            "created_at": datetime.now().isoformat()
-        }
+            "artifacts": artifacts
+        }])
+        
+    def add_test_results_batch(self, records: List[Dict]):
+        """
+        Add many test execution results in a single write.
         
+        Args:
+            records: Dicts with the add_test_result arguments as keys
+                (game_url, test_case, result, execution_time, artifacts)
+        """
+        if not records:
+            return
+            
+        created_at = datetime.now().isoformat()
+        ids, documents, metadatas = [], [], []
+        
+        for i, record in enumerate(records):
+            game_url = record["game_url"]
+            test_case = record["test_case"]
+            test_name = test_case.get("name", "Unknown")
+            content = f"Test: {test_name} Result: {record['result']}"
+            
+            ids.append(self._generate_id(f"{game_url}_{content}_{created_at}_{i}"))
+            documents.append(test_case)
+            metadatas.append({
+                "type": "test_result",
+                "game_url": game_url,
+                "test_name": test_name,
+                "result": record["result"],
+                "execution_time": record.get("execution_time", 0),
+                "created_at": created_at
+            })
+            
         if self.collection:
             self.collection.add(
-                documents=[json.dumps(test_case)],
-                metadatas=[doc_metadata],
-                ids=[doc_id]
+                **self._document_args([jsonlib.dumps(doc) for doc in documents]),
+                metadatas=metadatas,
+                ids=ids
             )
+            _patterns_changed()
         else:
-            self.patterns.append({
-                "id": doc_id,
-                "type": "test_result",
-                "test_case": test_case,
-                "result": result,
-                "metadata": doc_metadata
-            })
-            self._save_patterns()
+            records = [
+                {
+                    "id": doc_id,
+                    "type": "test_result",
+                    "test_case": test_case,
+                    "result": metadata["result"],
+                    "metadata": metadata
+                }
+                for doc_id, test_case, metadata in zip(ids, documents, metadatas)
+            ]
+            start = len(self.patterns)
+            self.patterns.extend(records)
+            self._index_patterns(start)
+            self._append_patterns(records)
             
     def search_patterns(
         self,
@@ -190,35 +446,103 @@ class KnowledgeBase:
         Returns:
             List of matching patterns
         """
-        if self.collection:
-            where_filter = {"game_type": game_type} if game_type else None
+        return self.search_patterns_batch([query], game_type, n_results)[0]
+        
+    def search_patterns_batch(
+        self,
+        queries: List[str],
+        game_type: Optional[str] = None,
+        n_results: int = 5
+    ) -> List[List[Dict]]:
+        """
+        Search for relevant patterns for several queries at once.
+        
+        Args:
+            queries: Search queries
+            game_type: Optional filter by game type
+            n_results: Number of results to return per query
             
-            results = self.collection.query(
-                query_texts=[query],
-                n_results=n_results,
-                where=where_filter
-            )
+        Returns:
+            One list of matching patterns per query, in query order
+        """
+        if not queries:
+            return []
+            
+        if self.collection:
+            # Repeated queries are served from the cache; only the misses
+            # go to Chroma, together in one query call
+            prefix = (str(self.rag_dir), _pattern_generation, game_type, n_results)
+            with _cache_lock:
+                cached = [_query_cache.get(prefix + (query,)) for query in queries]
+            misses = list(dict.fromkeys(
+                query for query, hit in zip(queries, cached) if hit is None
+            ))
+            if misses:
+                fetched = dict(zip(misses, self._query_collection(misses, game_type, n_results)))
+                with _cache_lock:
+                    for query, patterns in fetched.items():
+                        _query_cache.set(prefix + (query,), patterns)
+                cached = [
+                    fetched[query] if hit is None else hit
+                    for query, hit in zip(queries, cached)
+                ]
+            return copy.deepcopy(cached)
+        else:
+            return [self._search_file_patterns(query, n_results) for query in queries]
             
+    def _index_patterns(self, start: int):
+        """Add the patterns from position start onwards to the token index."""
+        index = self._token_index
+        for position in range(start, len(self.patterns)):
+            pattern = self.patterns[position]
+            text = str(pattern.get("content", "")) + " " + str(pattern.get("description", ""))
+            for token in set(_TOKEN_RE.findall(text.lower())):
+                index.setdefault(token, set()).add(position)
+                
+    def _query_collection(
+        self,
+        queries: List[str],
+        game_type: Optional[str],
+        n_results: int
+    ) -> List[List[Dict]]:
+        """Run one Chroma query for several query texts."""
+        where_filter = {"game_type": game_type} if game_type else None
+        
+        results = self.collection.query(
+            **self._query_args(queries),
+            n_results=n_results,
+            where=where_filter
+        )
+        
+        all_documents = results.get("documents") or [[] for _ in queries]
+        all_metadatas = results.get("metadatas")
+        all_distances = results.get("distances")
+        
+        batches = []
+        for q, docs in enumerate(all_documents):
             patterns = []
-            for i, doc in enumerate(results.get("documents", [[]])[0]):
+            for i, doc in enumerate(docs):
                 patterns.append({
                     "content": doc,
-                    "metadata": results.get("metadatas", [[]])[0][i] if results.get("metadatas") else {},
-                    "distance": results.get("distances", [[]])[0][i] if results.get("distances") else 0
+                    "metadata": all_metadatas[q][i] if all_metadatas else {},
+                    "distance": all_distances[q][i] if all_distances else 0
                 })
-            return patterns
-        else:
-            # Simple text-based search
-            query_lower = query.lower()
-            matches = []
-            for pattern in self.patterns:
-                content = str(pattern.get("content", "") + str(pattern.get("description", ""))).lower()
-                if query_lower in content or any(word in content for word in query_lower.split()):
-                    matches.append(pattern)
-                    if len(matches) >= n_results:
-                        break
-            return matches
-            
+            batches.append(patterns)
+        return batches
+        
+    def _search_file_patterns(self, query: str, n_results: int) -> List[Dict]:
+        """
+        Token search over the file fallback store.
+        
+        Patterns sharing the most tokens with the query come first; ties
+        keep storage order.
+        """
+        hits: Counter = Counter()
+        for token in set(_TOKEN_RE.findall(query.lower())):
+            hits.update(self._token_index.get(token, ()))
+        ranked = sorted(hits, key=lambda position: (-hits[position], position))
+        return [self.patterns[position] for position in ranked[:n_results]]
+        
     def get_successful_strategies(
         self,
         game_type: str,
@@ -235,20 +559,29 @@ class KnowledgeBase:
             List of successful strategies
         """
         if self.collection:
-            results = self.collection.query(
-                query_texts=[f"{game_type} testing strategies"],
-                n_results=20,
-                where={"game_type": game_type}
-            )
-            
-            strategies = []
-            for i, meta in enumerate(results.get("metadatas", [[]])[0]):
-                if meta.get("success_rate", 0) >= min_success_rate:
-                    strategies.append({
-                        "content": results.get("documents", [[]])[0][i],
-                        "metadata": meta
-                    })
-            return strategies
+            # Keyed by store location; instances are created per request
+            cache_key = (str(self.rag_dir), _pattern_generation, game_type, min_success_rate)
+            with _cache_lock:
+                strategies = _strategies_cache.get(cache_key)
+            if strategies is None:
+                # Let Chroma apply the success-rate threshold
+                results = self.collection.query(
+                    **self._query_args([f"{game_type} testing strategies"]),
+                    n_results=20,
+                    where={"$and": [
+                        {"game_type": game_type},
+                        {"success_rate": {"$gte": min_success_rate}}
+                    ]}
+                )
+                
+                documents = results.get("documents", [[]])[0]
+                strategies = [
+                    {"content": documents[i], "metadata": meta}
+                    for i, meta in enumerate(results.get("metadatas", [[]])[0])
+                ]
+                with _cache_lock:
+                    _strategies_cache.set(cache_key, strategies)
+            return copy.deepcopy(strategies)
         else:
             return [
                 p for p in self.patterns
@@ -277,6 +610,7 @@ class KnowledgeBase:
                         ids=[pattern_id],
                         metadatas=[metadata]
                     )
+                    _patterns_changed()
             except:
                 pass
         else:
@@ -284,8 +618,8 @@ class KnowledgeBase:
                 if pattern.get("id") == pattern_id:
                     pattern["metadata"]["success_rate"] = new_rate
                     pattern["metadata"]["updated_at"] = datetime.now().isoformat()
+                    self._append_patterns([pattern])
                     break
-            self._save_patterns()
             
     def get_stats(self) -> Dict:
         """Get knowledge base statistics."""
@@ -335,5 +669,6 @@ class KnowledgeBase:
             }
         ]
         
-        for pattern in default_patterns:
-            self.add_game_pattern(**pattern, success_rate=0.8)
+        self.add_game_patterns_bulk([
+            {**pattern, "success_rate": 0.8} for pattern in default_patterns
+        ])
@@ -0,0 +1,130 @@
+"""
+Persistent Cache - On-disk store for planner and ranker results
+Lets repeat runs against the same game skip test generation and ranking.
+"""
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from ..config import settings
+from ..utils import jsonlib
+
+logger = logging.getLogger(__name__)
+
+
+def game_fingerprint(game_analysis: Dict[str, Any], url: str, *extra: Any) -> str:
+    """
+    Deterministic key for a game analysis.
+    
+    Args:
+        game_analysis: Results from GameAnalyzerAgent
+        url: Game URL
+        extra: Further inputs the cached result depends on
+        
+    Returns:
+        Hex digest of the URL, game type, element count and sorted mechanics
+    """
+    parts: List[Any] = [
+        url,
+        game_analysis.get("game_type", ""),
+        game_analysis.get("element_count", 0),
+        sorted(str(m) for m in game_analysis.get("mechanics", [])),
+        *extra
+    ]
+    return hashlib.sha256(jsonlib.dump_bytes(parts, default=str)).hexdigest()
+
+
+class PersistentCache:
+    """
+    SQLite-backed key/value cache whose entries expire after a time-to-live.
+    
+    Keys are namespaced per agent so results never leak between them.
+    Safe to share across threads.
+    """
+    
+    def __init__(self, path: Path, ttl: float = 86400.0):
+        """
+        Open (or create) the cache database.
+        
+        Args:
+            path: SQLite database file
+            ttl: Seconds an entry stays valid
+        """
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "namespace TEXT NOT NULL, "
+                "key TEXT NOT NULL, "
+                "payload BLOB NOT NULL, "
+                "created_at REAL NOT NULL, "
+                "PRIMARY KEY (namespace, key))"
+            )
+            
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        """
+        Look up a cached value.
+        
+        Args:
+            namespace: Owner of the entry, e.g. "planner"
+            key: Entry key, usually from game_fingerprint
+            
+        Returns:
+            Decoded value, or None on a miss or an expired entry
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM results "
+                "WHERE namespace = ? AND key = ? AND created_at > ?",
+                (namespace, key, time.time() - self.ttl)
+            ).fetchone()
+        if row is None:
+            return None
+        try:
+            return jsonlib.loads(row[0])
+        except ValueError:
+            return None
+            
+    def set(self, namespace: str, key: str, value: Any):
+        """
+        Store a value, replacing any previous entry and pruning expired ones.
+        
+        Args:
+            namespace: Owner of the entry
+            key: Entry key
+            value: JSON-serializable value
+        """
+        payload = jsonlib.dump_bytes(value, default=str)
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM results WHERE created_at <= ?",
+                (now - self.ttl,)
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                (namespace, key, payload, now)
+            )
+
+
+@lru_cache(maxsize=1)
+def get_result_cache() -> Optional[PersistentCache]:
+    """Shared result cache, or None when disabled or it cannot be opened."""
+    if settings.RESULT_CACHE_TTL <= 0:
+        return None
+    try:
+        return PersistentCache(
+            settings.RAG_DIR / "result_cache.db",
+            ttl=settings.RESULT_CACHE_TTL
+        )
+    except sqlite3.Error as e:
+        logger.warning("Result cache init failed, continuing without it: %s", e, exc_info=True)
+        return None
@@ -1,4 +1,6 @@
 """Utilities package"""
 from .helpers import sanitize_filename, format_duration, truncate_text
+from .cache import TTLCache
+from . import jsonlib
 
-__all__ = ["sanitize_filename", "format_duration", "truncate_text"]
+__all__ = ["sanitize_filename", "format_duration", "truncate_text", "TTLCache", "jsonlib"]
@@ -0,0 +1,78 @@
+"""
+Small in-process caches
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class TTLCache:
+    """
+    Bounded LRU cache whose entries expire after a fixed time-to-live.
+    
+    Intended for memoizing expensive, process-local lookups (vision
+    analyses, knowledge-base searches). Not thread-safe; all callers run
+    on the same event loop.
+    """
+    
+    def __init__(self, maxsize: int = 128, ttl: Optional[float] = 300.0):
+        """
+        Initialize the cache.
+        
+        Args:
+            maxsize: Maximum number of entries kept
+            ttl: Seconds an entry stays valid, or None to never expire
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Get a cached value, refreshing its LRU position.
+        
+        Args:
+            key: Cache key
+            default: Value returned on a miss or an expired entry
+            
+        Returns:
+            Cached value or default
+        """
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+            
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return default
+            
+        self._data.move_to_end(key)
+        return value
+        
+    def set(self, key: Hashable, value: Any):
+        """
+        Store a value, evicting the least recently used entry when full.
+        
+        Args:
+            key: Cache key
+            value: Value to cache
+        """
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            
+    def clear(self):
+        """Drop every entry."""
+        self._data.clear()
+        
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+        
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+_MISSING = object()
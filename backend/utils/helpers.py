@@ -1,11 +1,16 @@
 """
 Utility helper functions
 """
-import re
+import time
 from datetime import datetime
+from functools import lru_cache
 from typing import Optional
 
 
+# Drops characters invalid in filenames and turns spaces into underscores
+_FILENAME_TRANS = str.maketrans({' ': '_', **{c: None for c in '<>:"/\\|?*'}})
+
+
 def sanitize_filename(name: str) -> str:
     """
     Sanitize a string to be used as a filename.
@@ -16,22 +21,22 @@ def sanitize_filename(name: str) -> str:
     Returns:
         Sanitized filename
     """
-    # Remove invalid characters
-    sanitized = re.sub(r'[<>:"/\\|?*]', '', name)
-    # Replace spaces with underscores
-    sanitized = sanitized.replace(' ', '_')
-    # Limit length
-    return sanitized[:100]
+    # Remove invalid characters and replace spaces in one pass; limit length
+    return name.translate(_FILENAME_TRANS)[:100]
 
 #format duration in milli seconds
 #duration
 #new
+@lru_cache(maxsize=4096)
 def format_duration(ms: int) -> str:
     """
     Format duration in milliseconds to human-readable string.
     
+    Integer arithmetic only; results are cached since step durations
+    often repeat.
+    
     Args:
-        ms: Duration in milliseconds
+        ms: Duration in whole milliseconds
         
     Returns:
         Formatted duration string
@@ -39,11 +44,11 @@ def format_duration(ms: int) -> str:
     if ms < 1000:
         return f"{ms}ms"
     elif ms < 60000:
-        return f"{ms / 1000:.1f}s"
+        tenths = (ms + 50) // 100  # Rounded to the nearest tenth of a second
+        return f"{tenths // 10}.{tenths % 10}s"
     else:
-        minutes = ms // 60000
-        seconds = (ms % 60000) / 1000
-        return f"{minutes}m {seconds:.0f}s"
+        minutes, rest = divmod(ms, 60000)
+        return f"{minutes}m {(rest + 500) // 1000}s"
 
 
 def truncate_text(text: str, max_length: int = 100, suffix: str = "...") -> str:
@@ -62,17 +67,34 @@ def truncate_text(text: str, max_length: int = 100, suffix: str = "...") -> str:
         return ""
     if len(text) <= max_length:
         return text
-    return text[:max_length - len(suffix)] + suffix
+    return f"{text[:max_length - len(suffix)]}{suffix}"
+
+
+@lru_cache(maxsize=1)
+def _iso_second(second: int) -> str:
+    """Format a whole epoch second as a local ISO timestamp."""
+    return datetime.fromtimestamp(second).isoformat()
 
 
 def timestamp_now() -> str:
-    """Get current timestamp as ISO format string."""
-    return datetime.now().isoformat()
+    """
+    Get current timestamp as ISO format string.
+    
+    Resolution is one second; the formatted string is reused for every
+    call within the same second.
+    """
+    return _iso_second(time.time_ns() // 1_000_000_000)
 
 
+@lru_cache(maxsize=4096)
 def parse_timestamp(ts: str) -> Optional[datetime]:
-    """Parse an ISO format timestamp string."""
+    """
+    Parse an ISO format timestamp string.
+    
+    Cached, since the same run timestamps are read many times while
+    building reports; datetimes are immutable, so sharing them is safe.
+    """
     try:
         return datetime.fromisoformat(ts)
-    except:
+    except (TypeError, ValueError):
         return None
@@ -0,0 +1,185 @@
+"""
+JSON encoding/decoding backed by orjson when installed, stdlib json otherwise
+"""
+import json
+from typing import Any, Callable, List, Optional, Union
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """
+    Parse a JSON document.
+
+    Args:
+        data: JSON text or UTF-8 bytes
+
+    Returns:
+        Decoded Python object
+
+    Raises:
+        ValueError: If data is not valid JSON
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dump_bytes(
+    obj: Any,
+    indent: bool = False,
+    default: Optional[Callable[[Any], Any]] = None
+) -> bytes:
+    """
+    Serialize an object to UTF-8 JSON bytes.
+
+    Args:
+        obj: Object to serialize
+        indent: Pretty-print with two-space indentation
+        default: Fallback converter for unsupported types
+
+    Returns:
+        Encoded JSON
+    """
+    if ORJSON_AVAILABLE:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=default, option=option)
+    return json.dumps(
+        obj,
+        indent=2 if indent else None,
+        default=default,
+        ensure_ascii=False
+    ).encode("utf-8")
+
+
+def dumps(
+    obj: Any,
+    indent: bool = False,
+    default: Optional[Callable[[Any], Any]] = None
+) -> str:
+    """
+    Serialize an object to a JSON string.
+
+    Args:
+        obj: Object to serialize
+        indent: Pretty-print with two-space indentation
+        default: Fallback converter for unsupported types
+
+    Returns:
+        Encoded JSON text
+    """
+    return dump_bytes(obj, indent=indent, default=default).decode("utf-8")
+
+
+def extract(text: str, container: type = list) -> Optional[Any]:
+    """
+    Pull a JSON array or object out of free-form model output.
+
+    Well-formed replies are parsed directly; otherwise decoding starts at
+    the first opening bracket and stops at its matching close, ignoring
+    any prose before or after.
+
+    Args:
+        text: Model output that should contain JSON
+        container: list or dict, the type of value expected
+
+    Returns:
+        The decoded value, or None if no value of that type was found
+    """
+    try:
+        value = loads(text)
+    except ValueError:
+        start = text.find("[" if container is list else "{")
+        if start < 0:
+            return None
+        try:
+            value, _ = json.JSONDecoder().raw_decode(text, start)
+        except ValueError:
+            return None
+    return value if isinstance(value, container) else None
+
+
+class ArrayItemParser:
+    """
+    Incremental parser for a JSON array arriving in chunks.
+    
+    Text before the opening bracket is skipped, and each top-level object or
+    array element is decoded as soon as its closing bracket arrives. Only the
+    element currently being received is buffered.
+    """
+    
+    def __init__(self):
+        self._started = False
+        self._done = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._partial: List[str] = []
+        
+    def feed(self, text: str) -> List[Any]:
+        """
+        Consume the next chunk of text.
+        
+        Args:
+            text: Next piece of the streamed output
+            
+        Returns:
+            Elements completed by this chunk; malformed elements are dropped
+        """
+        items: List[Any] = []
+        if self._done:
+            return items
+            
+        i = 0
+        if not self._started:
+            i = text.find("[")
+            if i < 0:
+                return items
+            self._started = True
+            i += 1
+            
+        # Start of the in-progress element within this chunk
+        mark = 0 if self._depth else None
+        n = len(text)
+        
+        while i < n:
+            ch = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{" or ch == "[":
+                if not self._depth:
+                    mark = i
+                self._depth += 1
+            elif ch == "}" or ch == "]":
+                if not self._depth:
+                    # Closing bracket of the array itself
+                    self._done = True
+                    break
+                self._depth -= 1
+                if not self._depth:
+                    self._partial.append(text[mark:i + 1])
+                    element = "".join(self._partial)
+                    self._partial = []
+                    mark = None
+                    try:
+                        items.append(loads(element))
+                    except ValueError:
+                        pass
+            i += 1
+            
+        if self._depth and mark is not None:
+            self._partial.append(text[mark:])
+        return items
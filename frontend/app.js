@@ -467,7 +467,9 @@ function getStatusClass(status) {
 function getArtifactIcon(type) {
     const icons = {
         'png': '📸',
+        'jpg': '📸',
         'html': '📄',
+        'gz': '📄',
         'json': '📋',
         'default': '📁'
     };
@@ -0,0 +1,39 @@
+"""
+Shared fixtures for the unit tests
+"""
+import pytest
+
+from backend.agents import planner_agent, ranker_agent
+from backend.rag import knowledge_base
+from backend.rag.persistent_cache import PersistentCache
+
+
+@pytest.fixture(autouse=True)
+def clear_llm_caches():
+    """In-process LLM caches would otherwise serve results across tests."""
+    planner_agent._generation_cache.clear()
+    ranker_agent._ranking_cache.clear()
+    yield
+    planner_agent._generation_cache.clear()
+    ranker_agent._ranking_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def result_cache(tmp_path, monkeypatch):
+    """Empty on-disk result cache used by the planner and ranker."""
+    cache = PersistentCache(tmp_path / "result_cache.db", ttl=3600)
+    monkeypatch.setattr(planner_agent, "get_result_cache", lambda: cache)
+    monkeypatch.setattr(ranker_agent, "get_result_cache", lambda: cache)
+    return cache
+
+
+@pytest.fixture
+def rag_dir(tmp_path, monkeypatch):
+    """RAG directory for a KnowledgeBase on the file-based fallback store."""
+    monkeypatch.setattr(knowledge_base, "CHROMA_AVAILABLE", False)
+    monkeypatch.setattr(
+        knowledge_base,
+        "settings",
+        knowledge_base.settings.model_copy(update={"RAG_DIR": tmp_path})
+    )
+    return tmp_path
@@ -0,0 +1,23 @@
+"""
+Tests for AnalyzerAgent helpers
+"""
+from backend.agents.analyzer_agent import AnalyzerAgent
+
+
+def test_unique_errors_first_seen_order():
+    runs = [{"error": "b"}, {"error": "a"}, {"error": "b"}, {"error": "c"}]
+
+    assert AnalyzerAgent()._unique_errors(runs) == ["b", "a", "c"]
+
+
+def test_unique_errors_skips_runs_without_error():
+    runs = [{}, {"error": None}, {"error": ""}, {"error": "timeout"}]
+
+    assert AnalyzerAgent()._unique_errors(runs) == ["timeout"]
+
+
+def test_unique_errors_stops_at_limit():
+    runs = [{"error": str(i)} for i in range(10)]
+
+    assert AnalyzerAgent()._unique_errors(runs, limit=2) == ["0", "1"]
+    assert AnalyzerAgent()._unique_errors([]) == []
@@ -0,0 +1,124 @@
+"""
+Tests for the in-process and on-disk caches
+"""
+from types import SimpleNamespace
+
+from backend.rag import persistent_cache
+from backend.rag.persistent_cache import PersistentCache, game_fingerprint
+from backend.utils import cache as cache_module
+from backend.utils.cache import TTLCache
+
+
+def _fake_clock(monkeypatch, module, attr):
+    """Replace module.time with a clock the test advances by hand."""
+    now = [1000.0]
+    monkeypatch.setattr(module, "time", SimpleNamespace(**{attr: lambda: now[0]}))
+    return now
+
+
+def test_ttl_cache_get_and_set():
+    cache = TTLCache(maxsize=4, ttl=None)
+    cache.set("a", 1)
+
+    assert cache.get("a") == 1
+    assert cache.get("missing", "default") == "default"
+    assert "a" in cache
+    assert "missing" not in cache
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=None)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert "b" not in cache
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+
+
+def test_ttl_cache_entries_expire(monkeypatch):
+    now = _fake_clock(monkeypatch, cache_module, "monotonic")
+    cache = TTLCache(maxsize=4, ttl=10)
+    cache.set("a", 1)
+
+    now[0] += 9
+    assert cache.get("a") == 1
+
+    now[0] += 1
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_ttl_cache_clear():
+    cache = TTLCache()
+    cache.set("a", 1)
+    cache.clear()
+
+    assert len(cache) == 0
+
+
+def test_game_fingerprint_ignores_mechanics_order():
+    analysis = {"game_type": "math", "element_count": 3, "mechanics": ["sum", "click"]}
+    reordered = dict(analysis, mechanics=["click", "sum"])
+
+    assert game_fingerprint(analysis, "http://game") == game_fingerprint(reordered, "http://game")
+
+
+def test_game_fingerprint_depends_on_url_and_extra_inputs():
+    analysis = {"game_type": "math", "element_count": 3, "mechanics": []}
+    key = game_fingerprint(analysis, "http://game", 20)
+
+    assert key != game_fingerprint(analysis, "http://other", 20)
+    assert key != game_fingerprint(analysis, "http://game", 10)
+    assert key != game_fingerprint(dict(analysis, element_count=4), "http://game", 20)
+
+
+def test_persistent_cache_round_trip(tmp_path):
+    cache = PersistentCache(tmp_path / "cache.db")
+    cache.set("planner", "key", [{"name": "Test"}])
+
+    assert cache.get("planner", "key") == [{"name": "Test"}]
+    assert cache.get("planner", "other") is None
+
+
+def test_persistent_cache_namespaces_are_separate(tmp_path):
+    cache = PersistentCache(tmp_path / "cache.db")
+    cache.set("planner", "key", "plan")
+    cache.set("ranker", "key", "ranking")
+
+    assert cache.get("planner", "key") == "plan"
+    assert cache.get("ranker", "key") == "ranking"
+
+
+def test_persistent_cache_set_replaces_entry(tmp_path):
+    cache = PersistentCache(tmp_path / "cache.db")
+    cache.set("planner", "key", 1)
+    cache.set("planner", "key", 2)
+
+    assert cache.get("planner", "key") == 2
+
+
+def test_persistent_cache_survives_reopen(tmp_path):
+    PersistentCache(tmp_path / "cache.db").set("planner", "key", "plan")
+
+    assert PersistentCache(tmp_path / "cache.db").get("planner", "key") == "plan"
+
+
+def test_persistent_cache_entries_expire(tmp_path, monkeypatch):
+    now = _fake_clock(monkeypatch, persistent_cache, "time")
+    cache = PersistentCache(tmp_path / "cache.db", ttl=60)
+    cache.set("planner", "key", "plan")
+
+    now[0] += 59
+    assert cache.get("planner", "key") == "plan"
+
+    now[0] += 1
+    assert cache.get("planner", "key") is None
+
+    # Expired rows are pruned on the next write
+    cache.set("planner", "other", "plan")
+    rows = cache._conn.execute("SELECT key FROM results").fetchall()
+    assert rows == [("other",)]
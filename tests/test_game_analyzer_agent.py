@@ -0,0 +1,83 @@
+"""
+Tests for GameAnalyzerAgent analysis caching
+"""
+import pytest
+
+from backend.agents import game_analyzer_agent
+from backend.agents.game_analyzer_agent import GameAnalyzerAgent
+from backend.browser.controller import BrowserController
+
+
+URL = "http://game.test"
+ELEMENTS = [{"tag": "button", "text": "Play", "x": 1, "y": 2}]
+
+
+class FakeKnowledgeBase:
+    def search_patterns(self, query, n_results=5):
+        return []
+
+
+class FakeBrowser:
+    """Browser stand-in serving one fixed page."""
+
+    game_state_from_snapshot = staticmethod(BrowserController.game_state_from_snapshot)
+
+    def __init__(self, screenshot):
+        self.screenshot = screenshot
+        self.dom_reads = 0
+
+    async def navigate(self, url):
+        pass
+
+    async def wait_until_ready(self):
+        pass
+
+    async def snapshot_page(self):
+        return {"interactive_elements": ELEMENTS, "score": "0", "visible_text": []}
+
+    async def get_dom_fingerprint(self):
+        return {"length": 42, "hash": "abc"}
+
+    async def screenshot_bytes(self):
+        return self.screenshot
+
+    async def get_dom(self):
+        self.dom_reads += 1
+        return "<html><div>Score</div><canvas></canvas></html>"
+
+
+@pytest.fixture
+def artifacts_dir(tmp_path, monkeypatch):
+    """Heuristic-only analyzer writing artifacts under tmp_path."""
+    monkeypatch.setattr(
+        game_analyzer_agent,
+        "settings",
+        game_analyzer_agent.settings.model_copy(update={"ARTIFACTS_DIR": tmp_path})
+    )
+    monkeypatch.setattr(game_analyzer_agent, "_get_ollama", lambda: None)
+    game_analyzer_agent._analysis_cache.clear()
+    game_analyzer_agent._pattern_cache.clear()
+    yield tmp_path
+    game_analyzer_agent._analysis_cache.clear()
+    game_analyzer_agent._pattern_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_cache_hit_reuses_analysis_and_keeps_screenshot(artifacts_dir):
+    agent = GameAnalyzerAgent(FakeKnowledgeBase())
+    first_browser = FakeBrowser(b"first")
+    second_browser = FakeBrowser(b"second")
+
+    first = await agent.analyze(first_browser, URL, "s1")
+    second = await agent.analyze(second_browser, URL, "s2")
+
+    # The second session is served from the cache without reading the DOM
+    assert first_browser.dom_reads == 1
+    assert second_browser.dom_reads == 0
+    assert second["session_id"] == "s2"
+    assert second["mechanics"] == first["mechanics"]
+    assert second["test_recommendations"] == first["test_recommendations"]
+
+    # Both sessions still get their own initial screenshot
+    assert (artifacts_dir / "s1" / "initial_analysis.png").read_bytes() == b"first"
+    assert (artifacts_dir / "s2" / "initial_analysis.png").read_bytes() == b"second"
@@ -0,0 +1,60 @@
+"""
+Tests for the JSON helpers
+"""
+from backend.utils import jsonlib
+from backend.utils.jsonlib import ArrayItemParser
+
+
+def test_extract_finds_embedded_container():
+    assert jsonlib.extract('Result: [1, 2] done', list) == [1, 2]
+    assert jsonlib.extract('{"a": 1}', dict) == {"a": 1}
+    assert jsonlib.extract('{"a": 1}', list) is None
+    assert jsonlib.extract("no json here", list) is None
+
+
+def _feed_in_chunks(text, size):
+    parser = ArrayItemParser()
+    items = []
+    for i in range(0, len(text), size):
+        items.extend(parser.feed(text[i:i + size]))
+    return items
+
+
+def test_array_item_parser_skips_preamble():
+    parser = ArrayItemParser()
+
+    assert parser.feed('Here are the tests:\n[{"a": 1}, {"b": 2}]') == [{"a": 1}, {"b": 2}]
+
+
+def test_array_item_parser_yields_items_as_they_close():
+    parser = ArrayItemParser()
+
+    assert parser.feed('[{"a": 1}, {"b"') == [{"a": 1}]
+    assert parser.feed(': 2}') == [{"b": 2}]
+
+
+def test_array_item_parser_chunk_size_does_not_matter():
+    text = '[{"name": "A", "steps": ["x", "y"]}, {"name": "B", "nested": {"k": [1, {"z": 2}]}}]'
+    expected = jsonlib.loads(text)
+
+    for size in (1, 2, 3, 7, len(text)):
+        assert _feed_in_chunks(text, size) == expected
+
+
+def test_array_item_parser_brackets_inside_strings():
+    text = r'[{"name": "Click [Start] {fast}", "note": "say \"]\" twice \\"}, {"b": 2}]'
+
+    assert _feed_in_chunks(text, 1) == jsonlib.loads(text)
+
+
+def test_array_item_parser_drops_malformed_items():
+    parser = ArrayItemParser()
+
+    assert parser.feed('[{"a": 1,}, {"b": 2}]') == [{"b": 2}]
+
+
+def test_array_item_parser_stops_at_end_of_array():
+    parser = ArrayItemParser()
+
+    assert parser.feed('[{"a": 1}] trailing [{"b": 2}]') == [{"a": 1}]
+    assert parser.feed('{"c": 3}') == []
@@ -0,0 +1,130 @@
+"""
+Tests for the knowledge base file-based fallback store
+"""
+from backend.rag.knowledge_base import KnowledgeBase
+from backend.utils import jsonlib
+
+
+def _write_jsonl(path, records):
+    path.write_bytes(b"".join(jsonlib.dump_bytes(r) + b"\n" for r in records))
+
+
+def _read_jsonl(path):
+    return [jsonlib.loads(line) for line in path.read_bytes().splitlines() if line.strip()]
+
+
+def _add_pattern(kb, name, description, strategy="Check it"):
+    return kb.add_game_pattern(
+        game_type="puzzle",
+        pattern_name=name,
+        description=description,
+        test_strategy=strategy
+    )
+
+
+def test_load_keeps_last_record_per_id(rag_dir):
+    _write_jsonl(rag_dir / "patterns.jsonl", [
+        {"id": "a", "content": "old"},
+        {"id": "b", "content": "other"},
+        {"id": "a", "content": "new"},
+    ])
+
+    kb = KnowledgeBase()
+
+    assert sorted((p["id"], p["content"]) for p in kb.patterns) == [("a", "new"), ("b", "other")]
+
+
+def test_load_skips_torn_final_line(rag_dir):
+    path = rag_dir / "patterns.jsonl"
+    _write_jsonl(path, [{"id": "a", "content": "kept"}])
+    with open(path, "ab") as f:
+        f.write(b'{"id": "b", "cont')
+
+    kb = KnowledgeBase()
+
+    assert [p["id"] for p in kb.patterns] == ["a"]
+
+
+def test_add_appends_to_jsonl(rag_dir):
+    kb = KnowledgeBase()
+    first = _add_pattern(kb, "Timer", "Countdown timer reaches zero")
+    second = _add_pattern(kb, "Score", "Score increases on match")
+
+    assert [r["id"] for r in _read_jsonl(rag_dir / "patterns.jsonl")] == [first, second]
+    assert [p["id"] for p in KnowledgeBase().patterns] == [first, second]
+
+
+def test_compact_rewrites_superseded_records(rag_dir):
+    path = rag_dir / "patterns.jsonl"
+    _write_jsonl(path, [
+        {"id": "a", "content": "v1"},
+        {"id": "a", "content": "v2"},
+        {"id": "b", "content": "only"},
+        {"id": "a", "content": "v3"},
+    ])
+    kb = KnowledgeBase()
+
+    kb.compact()
+
+    records = _read_jsonl(path)
+    assert sorted((r["id"], r["content"]) for r in records) == [("a", "v3"), ("b", "only")]
+    assert not path.with_suffix(".jsonl.tmp").exists()
+    assert kb._file_records == 2
+
+
+def test_compact_keeps_records_from_other_instances(rag_dir):
+    first = KnowledgeBase()
+    second = KnowledgeBase()
+    first_id = _add_pattern(first, "Timer", "Countdown timer reaches zero")
+    second_id = _add_pattern(second, "Score", "Score increases on match")
+
+    first.compact()
+
+    assert sorted(r["id"] for r in _read_jsonl(rag_dir / "patterns.jsonl")) == sorted([first_id, second_id])
+    assert sorted(p["id"] for p in first.patterns) == sorted([first_id, second_id])
+    assert [p["id"] for p in first.search_patterns("score")] == [second_id]
+
+
+def test_legacy_patterns_json_is_migrated_on_first_write(rag_dir):
+    legacy = rag_dir / "patterns.json"
+    legacy.write_bytes(jsonlib.dump_bytes([{"id": "old", "content": "legacy pattern"}]))
+
+    kb = KnowledgeBase()
+    assert [p["id"] for p in kb.patterns] == ["old"]
+
+    new_id = _add_pattern(kb, "Timer", "Countdown timer reaches zero")
+
+    assert not legacy.exists()
+    assert [r["id"] for r in _read_jsonl(rag_dir / "patterns.jsonl")] == ["old", new_id]
+    assert [p["id"] for p in KnowledgeBase().patterns] == ["old", new_id]
+
+
+def test_search_ranks_by_shared_tokens(rag_dir):
+    kb = KnowledgeBase()
+    score_id = _add_pattern(kb, "Score", "Score increases on match")
+    timer_id = _add_pattern(kb, "Timer", "Countdown timer reaches zero")
+    both_id = _add_pattern(kb, "Timed score", "Score bonus while the timer runs")
+
+    results = kb.search_patterns("timer score", n_results=3)
+
+    # Ties keep storage order
+    assert [p["id"] for p in results] == [both_id, score_id, timer_id]
+    assert kb.search_patterns("unrelated", n_results=5) == []
+
+
+def test_search_is_case_insensitive_and_limited(rag_dir):
+    kb = KnowledgeBase()
+    for i in range(4):
+        _add_pattern(kb, f"Board {i}", f"Board layout variant {i}")
+
+    assert len(kb.search_patterns("BOARD", n_results=2)) == 2
+
+
+def test_search_patterns_batch_keeps_query_order(rag_dir):
+    kb = KnowledgeBase()
+    score_id = _add_pattern(kb, "Score", "Score increases on match")
+    timer_id = _add_pattern(kb, "Timer", "Countdown timer reaches zero")
+
+    results = kb.search_patterns_batch(["countdown", "match"], n_results=1)
+
+    assert [[p["id"] for p in batch] for batch in results] == [[timer_id], [score_id]]
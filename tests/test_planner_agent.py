@@ -0,0 +1,142 @@
+"""
+Tests for PlannerAgent test generation
+"""
+import pytest
+
+from backend.agents.planner_agent import PlannerAgent, _dedupe_tests
+from backend.rag.persistent_cache import game_fingerprint
+from backend.utils import jsonlib
+
+
+GAME_ANALYSIS = {"game_type": "puzzle", "element_count": 2, "mechanics": ["click"]}
+URL = "http://game.test"
+
+LLM_TESTS = [
+    {"name": "Drag tile onto board", "description": "Tiles snap into empty cells",
+     "steps": ["Drag a tile", "Drop it on an empty cell"], "expected_result": "Tile snaps"},
+    {"name": "Undo last move", "description": "Undo restores the previous board",
+     "steps": ["Move a tile", "Press undo"], "expected_result": "Board restored"},
+    {"name": "Pause menu opens", "description": "Escape shows the pause overlay",
+     "steps": ["Press escape"], "expected_result": "Overlay visible"},
+]
+
+
+class FakeKnowledgeBase:
+    def search_patterns(self, query, n_results=5):
+        return []
+
+
+class StreamingChain:
+    """Chain stand-in that streams a JSON reply in small chunks."""
+
+    def __init__(self, tests):
+        self.text = "Sure!\n" + jsonlib.dumps(tests)
+        self.calls = 0
+
+    async def astream(self, variables):
+        self.calls += 1
+        for i in range(0, len(self.text), 5):
+            yield self.text[i:i + 5]
+
+
+class FailingChain:
+    def __init__(self):
+        self.calls = 0
+
+    async def astream(self, variables):
+        self.calls += 1
+        raise RuntimeError("model unavailable")
+        yield
+
+
+def _planner(chain):
+    agent = PlannerAgent(FakeKnowledgeBase())
+    agent.llm = object()
+    agent._chain = chain
+    return agent
+
+
+def _cache_key(agent, min_count):
+    return game_fingerprint(GAME_ANALYSIS, URL, min_count, agent.model_name)
+
+
+@pytest.mark.asyncio
+async def test_streamed_tests_are_decoded():
+    chain = StreamingChain(LLM_TESTS)
+
+    tests = await _planner(chain).generate_tests(GAME_ANALYSIS, URL, min_count=3)
+
+    assert chain.calls == 1
+    assert [t["name"] for t in tests] == [t["name"] for t in LLM_TESTS]
+    assert [t["id"] for t in tests] == [1, 2, 3]
+
+
+def test_dedupe_drops_reworded_duplicates():
+    test = {"name": "Score Display Test", "description": "Verify score updates",
+            "steps": ["Start game", "Score a point"]}
+    same_words = {"name": "score display test", "description": "Verify  SCORE updates",
+                  "steps": ["start game", "score a point"]}
+    other = {"name": "Restart Test", "description": "Verify the game resets",
+             "steps": ["Press restart"]}
+
+    assert _dedupe_tests([test, same_words, other]) == [test, other]
+
+
+def test_dedupe_keeps_distinct_tests_in_order():
+    assert _dedupe_tests(list(LLM_TESTS)) == LLM_TESTS
+
+
+@pytest.mark.asyncio
+async def test_short_llm_plan_is_padded():
+    agent = _planner(StreamingChain(LLM_TESTS))
+
+    tests = await agent.generate_tests(GAME_ANALYSIS, URL, min_count=5)
+
+    assert len(tests) == 5
+    assert tests[3]["name"] == "Element Interaction Test 1"
+
+
+@pytest.mark.asyncio
+async def test_llm_plan_is_persisted_and_reused(result_cache):
+    agent = _planner(StreamingChain(LLM_TESTS))
+
+    await agent.generate_tests(GAME_ANALYSIS, URL, min_count=3)
+
+    assert result_cache.get("planner", _cache_key(agent, 3)) is not None
+
+    # A later run is served from the persisted plan without the model
+    failing = FailingChain()
+    again = await _planner(failing).generate_tests(GAME_ANALYSIS, URL, min_count=3)
+
+    assert failing.calls == 0
+    assert [t["name"] for t in again] == [t["name"] for t in LLM_TESTS]
+
+
+@pytest.mark.asyncio
+async def test_llm_failure_falls_back_without_persisting(result_cache):
+    chain = FailingChain()
+    agent = _planner(chain)
+
+    tests = await agent.generate_tests(GAME_ANALYSIS, URL, min_count=5)
+
+    assert chain.calls == 1
+    assert len(tests) == 5
+    assert tests[0]["name"] == "Game Page Load Test"
+    assert result_cache.get("planner", _cache_key(agent, 5)) is None
+
+    # The next run retries the model
+    retry = StreamingChain(LLM_TESTS)
+    await _planner(retry).generate_tests(GAME_ANALYSIS, URL, min_count=3)
+    assert retry.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_template_plan_without_llm_is_persisted(result_cache):
+    agent = PlannerAgent(FakeKnowledgeBase())
+    agent.llm = None
+    agent._chain = None
+
+    tests = await agent.generate_tests(GAME_ANALYSIS, URL, min_count=4)
+
+    key = game_fingerprint(GAME_ANALYSIS, URL, 4, None)
+    assert [t["name"] for t in result_cache.get("planner", key)] == [t["name"] for t in tests]
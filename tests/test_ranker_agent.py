@@ -0,0 +1,117 @@
+"""
+Tests for RankerAgent ranking and result caching
+"""
+import pytest
+
+from backend.agents.ranker_agent import RankerAgent
+from backend.utils import jsonlib
+
+
+GAME_ANALYSIS = {"game_type": "puzzle", "url": "http://game.test", "mechanics": ["click"]}
+
+TESTS = [
+    {"id": 1, "name": "Tutorial Test", "category": "usability", "priority": "low"},
+    {"id": 2, "name": "Restart Test", "category": "functional", "priority": "high"},
+    {"id": 3, "name": "Modal Test", "category": "ui", "priority": "medium"},
+    {"id": 4, "name": "Rapid Click Test", "category": "edge_case", "priority": "medium"},
+]
+
+
+class RankingChain:
+    """Chain stand-in that ranks the given ids in order."""
+
+    def __init__(self, ids):
+        self.reply = "Ranked:\n" + jsonlib.dumps([
+            {"id": test_id, "overall_score": 10 - i, "ranking_reason": "llm"}
+            for i, test_id in enumerate(ids)
+        ])
+        self.calls = 0
+
+    async def ainvoke(self, variables):
+        self.calls += 1
+        return self.reply
+
+
+class FailingChain:
+    def __init__(self):
+        self.calls = 0
+
+    async def ainvoke(self, variables):
+        self.calls += 1
+        raise RuntimeError("model unavailable")
+
+
+def _ranker(chain):
+    agent = RankerAgent()
+    agent.llm = object()
+    agent._chain = chain
+    return agent
+
+
+def _cached_rows(cache):
+    return cache._conn.execute(
+        "SELECT key FROM results WHERE namespace = 'ranker'"
+    ).fetchall()
+
+
+@pytest.mark.asyncio
+async def test_llm_ranking_is_persisted_and_reused(result_cache):
+    chain = RankingChain([3, 1])
+
+    ranked = await _ranker(chain).rank_tests(TESTS, GAME_ANALYSIS, top_n=2)
+
+    assert chain.calls == 1
+    assert [t["id"] for t in ranked] == [3, 1]
+    assert ranked[0]["ranking_reason"] == "llm"
+    assert len(_cached_rows(result_cache)) == 1
+
+    failing = FailingChain()
+    again = await _ranker(failing).rank_tests(TESTS, GAME_ANALYSIS, top_n=2)
+
+    assert failing.calls == 0
+    assert again == ranked
+
+
+@pytest.mark.asyncio
+async def test_persisted_ranking_uses_current_test_fields():
+    await _ranker(RankingChain([3, 1])).rank_tests(TESTS, GAME_ANALYSIS, top_n=2)
+
+    current = [dict(test, generated_at="later") for test in TESTS]
+    again = await _ranker(FailingChain()).rank_tests(current, GAME_ANALYSIS, top_n=2)
+
+    assert [t["generated_at"] for t in again] == ["later", "later"]
+
+
+@pytest.mark.asyncio
+async def test_llm_failure_falls_back_without_persisting(result_cache):
+    chain = FailingChain()
+
+    ranked = await _ranker(chain).rank_tests(TESTS, GAME_ANALYSIS, top_n=2)
+
+    assert chain.calls == 1
+    assert [t["id"] for t in ranked] == [2, 3]
+    assert _cached_rows(result_cache) == []
+
+    # The next run retries the model
+    retry = RankingChain([3, 1])
+    await _ranker(retry).rank_tests(TESTS, GAME_ANALYSIS, top_n=2)
+    assert retry.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_unusable_llm_reply_falls_back(result_cache):
+    chain = RankingChain([99])
+
+    ranked = await _ranker(chain).rank_tests(TESTS, GAME_ANALYSIS, top_n=2)
+
+    assert [t["id"] for t in ranked] == [2, 3]
+    assert _cached_rows(result_cache) == []
+
+
+@pytest.mark.asyncio
+async def test_ranking_leaves_input_tests_unmodified():
+    tests = [dict(test) for test in TESTS]
+
+    await _ranker(RankingChain([3, 1])).rank_tests(tests, GAME_ANALYSIS, top_n=2)
+
+    assert tests == TESTS